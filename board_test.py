@@ -0,0 +1,343 @@
+"""
+This file contains test cases to verify that the alternative board backends
+and board extensions in the `isolation` package follow the same rules as the
+reference `isolation.Board` implementation.
+"""
+import os
+import pickle
+import random
+import tempfile
+import unittest
+
+import isolation
+
+try:
+    import numpy
+    from isolation.batch_board import BatchBoard
+except ImportError:
+    numpy = None
+
+
+def random_game(board_cls, seed, w=7, h=7):
+    """Play a random game on a new board of the given class and return the
+    list of moves applied (in order).
+    """
+    rng = random.Random(seed)
+    board = board_cls("Player1", "Player2", w, h)
+    moves = []
+    while True:
+        legal_moves = board.get_legal_moves()
+        if not legal_moves:
+            return moves
+        move = rng.choice(legal_moves)
+        board.apply_move(move)
+        moves.append(move)
+
+
+class BitBoardTest(unittest.TestCase):
+
+    def test_matches_board(self):
+        """ Test BitBoard generates the same moves as Board on random games """
+        for seed, (w, h) in enumerate([(7, 7), (5, 9), (9, 5), (11, 11)]):
+            moves = random_game(isolation.Board, seed, w, h)
+            board = isolation.Board("Player1", "Player2", w, h)
+            bitboard = isolation.BitBoard("Player1", "Player2", w, h)
+
+            for move in moves:
+                for player in ("Player1", "Player2"):
+                    self.assertEqual(board.get_legal_moves(player),
+                                     bitboard.get_legal_moves(player))
+                    self.assertEqual(board.get_player_location(player),
+                                     bitboard.get_player_location(player))
+                    self.assertEqual(board.is_winner(player),
+                                     bitboard.is_winner(player))
+                    self.assertEqual(board.is_loser(player),
+                                     bitboard.is_loser(player))
+                self.assertEqual(board.get_legal_moves(),
+                                 bitboard.get_legal_moves())
+                self.assertEqual(board.get_blank_spaces(),
+                                 bitboard.get_blank_spaces())
+                self.assertEqual(board.blank_mask(), bitboard.blank_mask())
+                self.assertEqual(board.to_string(), bitboard.to_string())
+                board.apply_move(move)
+                bitboard.apply_move(move)
+
+            self.assertEqual(bitboard.get_legal_moves(), [])
+            self.assertEqual(board.utility("Player1"),
+                             bitboard.utility("Player1"))
+
+    def test_copy(self):
+        """ Test BitBoard.copy and forecast_move leave the original intact """
+        bitboard = isolation.BitBoard("Player1", "Player2")
+        bitboard.apply_move((2, 3))
+        bitboard.apply_move((0, 0))
+
+        new_board = bitboard.forecast_move((0, 2))
+        self.assertIsInstance(new_board, isolation.BitBoard)
+        self.assertEqual(bitboard.get_player_location("Player1"), (2, 3))
+        self.assertEqual(new_board.get_player_location("Player1"), (0, 2))
+        self.assertTrue(bitboard.move_is_legal((0, 2)))
+        self.assertFalse(new_board.move_is_legal((0, 2)))
+        self.assertEqual(bitboard.move_count + 1, new_board.move_count)
+
+    def test_from_board(self):
+        """ Test BitBoard.from_board reproduces a game in progress """
+        board = isolation.Board("Player1", "Player2", 7, 5)
+        for move in random_game(isolation.Board, 7, 7, 5)[:9]:
+            board.apply_move(move)
+
+        bitboard = isolation.BitBoard.from_board(board)
+        self.assertEqual(board.to_string(), bitboard.to_string())
+        self.assertEqual(board.active_player, bitboard.active_player)
+        self.assertEqual(board.move_count, bitboard.move_count)
+        self.assertEqual(board.get_legal_moves(), bitboard.get_legal_moves())
+
+
+class PushPopTest(unittest.TestCase):
+
+    def check_push_pop(self, board_cls):
+        moves = random_game(board_cls, 3)
+        board = board_cls("Player1", "Player2")
+        snapshots = []
+        for move in moves:
+            snapshots.append((board.to_string(), board.active_player,
+                              board.move_count, board.get_legal_moves(),
+                              board.get_player_location("Player1"),
+                              board.get_player_location("Player2"),
+                              board.blank_mask()))
+            board.push_move(move)
+
+        for move in reversed(moves):
+            self.assertEqual(board.pop_move(), move)
+            self.assertEqual(snapshots.pop(),
+                             (board.to_string(), board.active_player,
+                              board.move_count, board.get_legal_moves(),
+                              board.get_player_location("Player1"),
+                              board.get_player_location("Player2"),
+                              board.blank_mask()))
+
+    def test_board(self):
+        """ Test Board.pop_move restores the state before push_move """
+        self.check_push_pop(isolation.Board)
+
+    def test_bitboard(self):
+        """ Test BitBoard.pop_move restores the state before push_move """
+        self.check_push_pop(isolation.BitBoard)
+
+
+class HashKeyTest(unittest.TestCase):
+
+    def test_incremental(self):
+        """ Test the incremental hash_key matches a full recomputation """
+        for board_cls in (isolation.Board, isolation.BitBoard):
+            moves = random_game(board_cls, 5)
+            board = board_cls("Player1", "Player2")
+            keys = [board.hash_key]
+            for move in moves:
+                board.push_move(move)
+                self.assertEqual(board.hash_key,
+                                 board.__compute_hash_key__())
+                keys.append(board.hash_key)
+            self.assertEqual(len(set(keys)), len(keys))
+
+            for _ in moves:
+                keys.pop()
+                board.pop_move()
+                self.assertEqual(board.hash_key, keys[-1])
+
+    def test_backends_agree(self):
+        """ Test Board and BitBoard hash the same position identically """
+        board = isolation.Board("Player1", "Player2", 5, 6)
+        bitboard = isolation.BitBoard("Player1", "Player2", 5, 6)
+        for move in random_game(isolation.Board, 11, 5, 6):
+            board.apply_move(move)
+            bitboard.apply_move(move)
+            self.assertEqual(board.hash_key, bitboard.hash_key)
+
+    def test_transposition(self):
+        """ Test move orders reaching the same position share a hash_key """
+        board = isolation.Board("Player1", "Player2")
+        for move in [(3, 3), (0, 0), (1, 2), (2, 1), (0, 4)]:
+            board.apply_move(move)
+        other = isolation.Board("Player1", "Player2")
+        for move in [(1, 2), (0, 0), (3, 3), (2, 1), (0, 4)]:
+            other.apply_move(move)
+        self.assertEqual(board.to_string(), other.to_string())
+        self.assertEqual(board.hash_key, other.hash_key)
+        self.assertNotEqual(board.hash_key,
+                            board.forecast_move((2, 5)).hash_key)
+
+
+class TablesTest(unittest.TestCase):
+
+    def test_tables(self):
+        """ Test the board tables against a direct computation per cell """
+        for w, h in [(7, 7), (5, 9), (1, 3)]:
+            tables = isolation.tables.board_tables(w, h)
+            self.assertIs(tables, isolation.tables.board_tables(w, h))
+            for idx, (r, c) in enumerate(tables.cells):
+                self.assertEqual(idx, c * h + r)
+                dests = [(r + dr, c + dc) for dr, dc in isolation.tables.DIRECTIONS
+                         if 0 <= r + dr < h and 0 <= c + dc < w]
+                self.assertEqual(list(tables.neighbors[idx]), dests)
+                self.assertEqual([m for _, m in tables.moves[idx]], dests)
+                self.assertEqual(list(tables.knight_bits[idx]),
+                                 [(1 << (col * h + row), 1 << d)
+                                  for d, (row, col) in zip(tables.directions[idx], dests)])
+                adjacent = [(r + dr, c + dc) for dr in (-1, 0, 1) for dc in (-1, 0, 1)
+                            if (dr or dc) and 0 <= r + dr < h and 0 <= c + dc < w]
+                self.assertEqual(sorted(tables.king_neighbors[idx]), adjacent)
+                self.assertEqual(tables.centrality[idx],
+                                 1 - abs(r - (w - 1) / 2) / float(w)
+                                 - abs(c - (h - 1) / 2) / float(h))
+
+    def test_cache_file(self):
+        """ Test tables survive a cache file and pickle by size only """
+        tables = isolation.tables.board_tables(6, 8)
+        self.assertLess(len(pickle.dumps(tables)), 200)
+        self.assertIs(pickle.loads(pickle.dumps(tables)), tables)
+
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            isolation.tables.save_tables(path)
+            del isolation.tables.__board_tables__[(6, 8)]
+            self.assertGreater(isolation.tables.load_tables(path), 0)
+        finally:
+            os.remove(path)
+        loaded = isolation.tables.board_tables(6, 8)
+        self.assertIsNot(loaded, tables)
+        self.assertEqual(loaded.__dict__, tables.__dict__)
+        self.assertEqual(isolation.tables.load_tables(path), 0)
+
+    def test_stale_cache_file(self):
+        """ Test cache files of another format are ignored and rebuilt """
+        state = dict(isolation.tables.board_tables(6, 8).__dict__)
+        del state["directions"]
+        version = isolation.tables.TABLES_VERSION
+        for saved in ({(6, 8): state},
+                      (version - 1, {(6, 8): state}),
+                      (version, {(6, 8): state}),
+                      (version, {(8, 6): isolation.tables.board_tables(6, 8).__dict__})):
+            fd, path = tempfile.mkstemp()
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    pickle.dump(saved, f)
+                del isolation.tables.__board_tables__[(6, 8)]
+                isolation.tables.__board_tables__.pop((8, 6), None)
+                self.assertEqual(isolation.tables.load_tables(path), 0)
+            finally:
+                os.remove(path)
+            self.assertNotIn((6, 8), isolation.tables.__board_tables__)
+            self.assertNotIn((8, 6), isolation.tables.__board_tables__)
+            self.assertTrue(hasattr(isolation.tables.board_tables(6, 8),
+                                    "directions"))
+
+
+class ComponentsTest(unittest.TestCase):
+
+    def reachable(self, board, player):
+        """Return the blank cells reachable by `player` with a plain
+        depth-first walk over the knight moves."""
+        start = board.get_player_location(player)
+        if start is None:
+            return set(board.get_blank_spaces())
+        blank_spaces = set(board.get_blank_spaces())
+        seen = set()
+        frontier = [start]
+        while frontier:
+            r, c = frontier.pop()
+            for dr, dc in isolation.tables.DIRECTIONS:
+                cell = (r + dr, c + dc)
+                if cell in blank_spaces and cell not in seen:
+                    seen.add(cell)
+                    frontier.append(cell)
+        return seen
+
+    def test_incremental(self):
+        """ Test the incremental components match a full recomputation """
+        for board_cls in (isolation.Board, isolation.BitBoard):
+            for seed, (w, h) in enumerate([(7, 7), (5, 6), (4, 4)]):
+                board = board_cls("Player1", "Player2", w, h)
+                board.components
+                for move in random_game(board_cls, seed, w, h):
+                    board.apply_move(move)
+                    fresh = board.copy()
+                    fresh.__components__ = None
+                    self.assertEqual(sorted(board.components),
+                                     sorted(fresh.components))
+
+    def test_queries(self):
+        """ Test reachable_count and players_separated against a plain walk """
+        separated = 0
+        for board_cls in (isolation.Board, isolation.BitBoard):
+            for seed in range(6):
+                board = board_cls("Player1", "Player2", 5, 5)
+                for move in random_game(board_cls, seed, 5, 5):
+                    regions = [self.reachable(board, player)
+                               for player in ("Player1", "Player2")]
+                    for player, region in zip(("Player1", "Player2"), regions):
+                        self.assertEqual(board.reachable_count(player), len(region))
+                    expected = None not in (board.get_player_location("Player1"),
+                                            board.get_player_location("Player2")) \
+                        and not regions[0] & regions[1]
+                    self.assertEqual(board.players_separated(), expected)
+                    separated += expected
+                    board.apply_move(move)
+        self.assertGreater(separated, 0)
+
+    def test_push_pop(self):
+        """ Test pop_move restores the components before push_move """
+        for board_cls in (isolation.Board, isolation.BitBoard):
+            moves = random_game(board_cls, 9)
+            board = board_cls("Player1", "Player2")
+            history = [board.components]
+            for move in moves:
+                board.push_move(move)
+                history.append(board.components)
+            for _ in moves:
+                history.pop()
+                board.pop_move()
+                self.assertEqual(board.components, history[-1])
+
+
+@unittest.skipIf(numpy is None, "BatchBoard requires numpy")
+class BatchBoardTest(unittest.TestCase):
+
+    def test_step(self):
+        """ Test BatchBoard only plays moves that Board allows """
+        rng = numpy.random.default_rng(0)
+        for plies in (0, 1, 6):
+            board = isolation.Board("Player1", "Player2", 7, 5)
+            for move in random_game(isolation.Board, 2, 7, 5)[:plies]:
+                board.apply_move(move)
+            batch = BatchBoard.from_board(board, 64)
+            legal_moves = board.get_legal_moves()
+            slot = 0 if board.active_player == "Player1" else 1
+
+            self.assertTrue(batch.step(rng))
+            for i in range(batch.k):
+                move = (batch.rows[i, slot], batch.cols[i, slot])
+                self.assertIn(move, legal_moves)
+                self.assertEqual(batch.active[i], 1 - slot)
+                self.assertEqual(batch.move_count[i], board.move_count + 1)
+                self.assertEqual(batch.blocked[i].sum(), board.move_count + 1)
+
+    def test_playout(self):
+        """ Test every game of a BatchBoard playout ends with a winner """
+        rng = numpy.random.default_rng(1)
+        board = isolation.Board("Player1", "Player2")
+        for move in random_game(isolation.Board, 4)[:4]:
+            board.apply_move(move)
+        batch = BatchBoard.from_board(board, 128)
+        winner = batch.playout(rng)
+        self.assertTrue(((winner == 0) | (winner == 1)).all())
+        self.assertFalse(batch.legal_moves_mask().any())
+        # the loser is the player to move in a finished game
+        self.assertTrue((winner == 1 - batch.active).all())
+        self.assertTrue((batch.blocked.reshape(batch.k, -1).sum(axis=1) ==
+                         batch.move_count).all())
+
+
+if __name__ == '__main__':
+    unittest.main()
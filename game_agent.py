@@ -7,8 +7,24 @@ augment the test suite with your own test cases to further test your code.
 You must test your agent's strength against a set of agents with known
 relative strength using tournament.py and include the results in your report.
 """
+import collections
+import ctypes
+import functools
+import io
+import json
 import random
 import math
+import multiprocessing
+import os
+import pickle
+import struct
+import timeit
+import weakref
+
+from multiprocessing import shared_memory
+
+from isolation import BitBoard
+from isolation.tables import board_tables, knight_fill
 
 
 class Timeout(Exception):
@@ -46,6 +62,159 @@ def improved_score(game, player):
     opp_moves = len(game.get_legal_moves(game.get_opponent(player)))
     return float(own_moves - opp_moves)
 
+def k_step_mobility(game, player, k=2, open_mask=None):
+    """Count the blank cells the given player can reach in at most k moves,
+    expanding the reached cells one move at a time with
+    `isolation.tables.knight_fill` (a player who has not moved yet reaches
+    every blank cell).
+
+    Parameters
+    ----------
+    game : `isolation.Board`
+        An instance of `isolation.Board` encoding the current state of the
+        game (e.g., player locations and blocked cells).
+
+    player : hashable
+        One of the objects registered by the game object as a valid player.
+
+    k : int (optional)
+        The number of moves; 1 counts the legal moves.
+
+    open_mask : int (optional)
+        game.blank_mask(), when the caller already has it.
+
+    Returns
+    ----------
+    int
+    """
+    if open_mask is None:
+        open_mask = game.blank_mask()
+    location = game.get_player_location(player)
+    if location is None:
+        return bin(open_mask).count("1")
+
+    masks = board_tables(game.width, game.height).masks
+    r, c = location
+    reached = knight_fill(masks, masks[c * game.height + r] & open_mask,
+                          open_mask, steps=k - 1)
+    return bin(reached).count("1")
+
+def k_step_score(game, player, k=2):
+    """The "Improved" score computed on deeper mobility: the difference in
+    the number of blank cells the two players can reach in at most k moves
+    (two by default; use e.g. functools.partial(k_step_score, k=3) as a
+    score_fn for another depth).
+
+    Parameters
+    ----------
+    game : `isolation.Board`
+        An instance of `isolation.Board` encoding the current state of the
+        game (e.g., player locations and blocked cells).
+
+    player : hashable
+        One of the objects registered by the game object as a valid player.
+        (i.e., `player` should be either game.__player_1__ or
+        game.__player_2__).
+
+    k : int (optional)
+        The number of moves looked ahead by each player.
+
+    Returns
+    ----------
+    float
+        The heuristic value of the current game state
+    """
+    open_mask = game.blank_mask()
+    if not k_step_mobility(game, game.active_player, 1, open_mask):
+        return float("-inf") if game.active_player == player else float("inf")
+
+    own_cells = k_step_mobility(game, player, k, open_mask)
+    opp_cells = k_step_mobility(game, game.get_opponent(player), k, open_mask)
+    return float(own_cells - opp_cells)
+
+def knight_pattern(game, player, ring2=False, open_mask=None):
+    """Encode the neighborhood of the given player as a pattern index: bit i
+    is set when the knight destination `isolation.tables.DIRECTIONS[i]` is a
+    blank cell. With ring2, the number of blank cells two moves away (at
+    most 15) is stored above those 8 bits. A player who has not moved yet
+    can go anywhere, which is encoded as every cell being blank.
+
+    The pattern is built from the blank bits of the knight destinations with
+    `BoardTables.knight_bits`, and the second ring is one
+    `isolation.tables.knight_fill` step from them, so no move is generated
+    or tested (open_mask is game.blank_mask(), when the caller already has
+    it).
+    """
+    location = game.get_player_location(player)
+    if location is None:
+        return 0xff | (15 << 8 if ring2 else 0)
+    if open_mask is None:
+        open_mask = game.blank_mask()
+    tables = board_tables(game.width, game.height)
+    r, c = location
+    idx = c * game.height + r
+    first = tables.masks[idx] & open_mask
+    pattern = 0
+    for bit, direction_bit in tables.knight_bits[idx]:
+        if first & bit:
+            pattern |= direction_bit
+    if ring2:
+        second = knight_fill(tables.masks, first, open_mask, steps=1) ^ first
+        pattern |= min(bin(second).count("1"), 15) << 8
+    return pattern
+
+def load_pattern_table(path):
+    """Load a pattern table written by generate_pattern_table.py, returning
+    (ring2, scores) where scores[knight_pattern(game, player, ring2)] is the
+    value of the neighborhood for the player. Without the file, every
+    pattern scores its number of legal moves, as improved_score does."""
+    try:
+        with open(path) as f:
+            table = json.load(f)
+    except (IOError, OSError):
+        return False, tuple(float(bin(pattern).count("1")) for pattern in range(256))
+    return table["ring2"], tuple(table["scores"])
+
+PATTERN_TABLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                  "pattern_table.json")
+PATTERN_RING2, PATTERN_SCORES = load_pattern_table(PATTERN_TABLE_FILE)
+
+def pattern_score(game, player):
+    """outputs a score equal to the difference in the table values of the
+    knight neighborhoods of the two players (see knight_pattern()). The
+    table, PATTERN_SCORES, is generated offline by generate_pattern_table.py
+    and loaded when this module is imported. With the 8-bit patterns a leaf
+    costs about a quarter less than custom_score; the ring2 patterns add a
+    knight_fill step per player and cost about half as much again as
+    custom_score.
+
+    Parameters
+    ----------
+    game : `isolation.Board`
+        An instance of `isolation.Board` encoding the current state of the
+        game (e.g., player locations and blocked cells).
+
+    player : hashable
+        One of the objects registered by the game object as a valid player.
+        (i.e., `player` should be either game.__player_1__ or
+        game.__player_2__).
+
+    Returns
+    ----------
+    float
+        The heuristic value of the current game state
+    """
+    open_mask = game.blank_mask()
+    own_pattern = knight_pattern(game, player, PATTERN_RING2, open_mask)
+    opp_pattern = knight_pattern(game, game.get_opponent(player), PATTERN_RING2,
+                                 open_mask)
+
+    #a player to move with no blank knight destination has lost
+    if not (own_pattern if game.active_player == player else opp_pattern) & 0xff:
+        return float("-inf") if game.active_player == player else float("inf")
+
+    return PATTERN_SCORES[own_pattern] - PATTERN_SCORES[opp_pattern]
+
 def open_move_score(game, player):
     """The basic evaluation function described in lecture that outputs a score
     equal to the number of moves open for your computer player on the board.
@@ -83,15 +252,16 @@ def count_legal_moves(game, player,threshold):
     count the possible moves for an L-shaped motion (like a
     knight in chess). stop counting if threshold reached
     """
-    count=0
-    
-    r, c = game.get_player_location(player)
+    location = game.get_player_location(player)
+    #before its first move a player can move to any blank cell
+    if location is None:
+        return min(game.width*game.height-game.move_count, threshold)
 
-    directions = [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
-                  (1, -2),  (1, 2), (2, -1),  (2, 1)]
-
-    for dr, dc in directions:
-        if game.move_is_legal((r+dr, c+dc)):
+    count=0
+    r, c = location
+    move_is_legal=game.move_is_legal
+    for move in board_tables(game.width, game.height).neighbors[c*game.height+r]:
+        if move_is_legal(move):
             count=count+1            
             if count >= threshold:
                 return count
@@ -99,116 +269,139 @@ def count_legal_moves(game, player,threshold):
             
     return count 
 
-def improved_score_with_distance_factor(game, player):
-    
-    threshold=8   
-    
-    if game.is_loser(player):
-        return float("-inf")
+# features of a position from the point of view of one player, see
+# extract_features()
+Features = collections.namedtuple("Features", [
+    "terminal", "own_moves", "opp_moves", "own_centrality", "opp_centrality",
+    "own_two_step", "opp_two_step", "blank_count"])
+
+def two_step_count(moves, neighbors, height, move_is_legal):
+    """Return the number of distinct cells where `move_is_legal` holds that
+    are one knight move away from one of `moves` (`neighbors` is
+    `BoardTables.neighbors` for a board of the given height)."""
+    reached = set()
+    for r, c in moves:
+        for m in neighbors[c * height + r]:
+            if move_is_legal(m):
+                reached.add(m)
+    return len(reached)
+
+def extract_features(game, player, two_step=True):
+    """Compute in one pass the features the heuristics in this file combine,
+    so that no move list is generated twice for the same leaf.
 
-    if game.is_winner(player):
-        return float("inf")
+    Parameters
+    ----------
+    game : `isolation.Board`
+        An instance of `isolation.Board` encoding the current state of the
+        game (e.g., player locations and blocked cells).
+
+    player : hashable
+        One of the objects registered by the game object as a valid player.
+        (i.e., `player` should be either game.__player_1__ or
+        game.__player_2__).
+
+    two_step : bool (optional)
+        Whether to count the two-step mobility, which costs more than the
+        other features; the counts are None when False.
+
+    Returns
+    ----------
+    Features
+        terminal is 1 if `player` has won, -1 if it has lost and 0 if the
+        game is not over. own_moves/opp_moves count the legal moves of
+        `player` and its opponent, own_two_step/opp_two_step the blank cells
+        they can reach in exactly two moves, and own_centrality/
+        opp_centrality read `BoardTables.centrality` at their location (0
+        before their first move, when every blank cell is a legal move).
+        blank_count is the number of blank cells.
+    """
+    tables = board_tables(game.width, game.height)
+    centrality = tables.centrality
+    height = game.height
+    blank_count = game.width * height - game.move_count
+
+    #the board generates the move lists from its own state, which is cheaper
+    #than testing every knight destination with move_is_legal()
+    opponent = game.get_opponent(player)
+    own_moves = game.get_legal_moves(player)
+    opp_moves = game.get_legal_moves(opponent)
+    own_location = game.get_player_location(player)
+    opp_location = game.get_player_location(opponent)
+
+    own_centrality = opp_centrality = 0.
+    if own_location is not None:
+        own_centrality = centrality[own_location[1] * height + own_location[0]]
+    if opp_location is not None:
+        opp_centrality = centrality[opp_location[1] * height + opp_location[0]]
+
+    own_two_step = opp_two_step = None
+    if two_step:
+        own_two_step = opp_two_step = blank_count
+        if own_location is not None:
+            own_two_step = two_step_count(own_moves, tables.neighbors, height,
+                                          game.move_is_legal)
+        if opp_location is not None:
+            opp_two_step = two_step_count(opp_moves, tables.neighbors, height,
+                                          game.move_is_legal)
+
+    active = game.active_player == player
+    terminal = 0
+    if not (own_moves if active else opp_moves):
+        terminal = -1 if active else 1
+    #tuple.__new__ skips the argument handling of Features.__new__
+    return tuple.__new__(Features, (terminal, len(own_moves), len(opp_moves),
+                                    own_centrality, opp_centrality,
+                                    own_two_step, opp_two_step, blank_count))
+
+def improved_score_with_distance_factor(game, player):
     
-    own_moves = count_legal_moves(game, player,threshold)
-#    own_moves_testing = len(game.get_legal_moves(player))
-    #replaces the is_loser call. gaining time most of the time
-#    if own_moves==0 and game.active_player==player:
-#        return float("-inf")
+    features = extract_features(game, player, two_step=False)
     
-    opp_moves = count_legal_moves(game, game.get_opponent(player),threshold)
-#    opp_moves_testing = len(game.get_legal_moves(game.get_opponent(player)))   
-    #replaces the is_winner call. gaining time most of the time
-#    if opp_moves==0 and game.inactive_player==player:
-#        return float("+inf")
-
-    center_x=(game.width-1)/2
-    center_y=(game.height-1)/2
-                       
-    center_x_me_d=abs(game.get_player_location(player)[0]-center_x)/float(game.width)
-    center_y_me_d=abs(game.get_player_location(player)[1]-center_y)/float(game.height)
-    distance_factor_own=1-center_x_me_d-center_y_me_d
+    if features.terminal:
+        return features.terminal*float("inf")
     
-    score=own_moves-opp_moves+distance_factor_own
+    score=features.own_moves-features.opp_moves+features.own_centrality
     return score
 
 def improved_score_with_distance_factor2(game, player):
     
-    threshold=8    
-    own_moves = count_legal_moves(game, player,threshold)
-#    own_moves_testing = len(game.get_legal_moves(player))
-    #replaces the is_loser call. gaining time most of the time
-    if own_moves==0 and game.active_player==player:
-        return float("-inf")
-    
-    opp_moves = count_legal_moves(game, game.get_opponent(player),threshold)
-#    opp_moves_testing = len(game.get_legal_moves(game.get_opponent(player)))   
-    #replaces the is_winner call. gaining time most of the time
-    if opp_moves==0 and game.inactive_player==player:
-        return float("+inf")
-
+    features = extract_features(game, player, two_step=False)
     
-#    if ( game.active_player == player ):
+    if features.terminal:
+        return features.terminal*float("inf")
 
     if ( game.move_count > 20 ):
-        center_x=(game.width-1)/2
-        center_y=(game.height-1)/2
-                     
-            
-        center_x_me_d=abs(game.get_player_location(player)[0]-center_x)/float(game.width)
-        center_y_me_d=abs(game.get_player_location(player)[1]-center_y)/float(game.height)
-        distance_factor_own=1-center_x_me_d-center_y_me_d
-        
-        center_x_opp_d=abs(game.get_player_location(game.get_opponent(player))[0]-center_x)/float(game.width)
-        center_y_opp_d=abs(game.get_player_location(game.get_opponent(player))[1]-center_y)/float(game.height)
-        distance_factor_opp=1-center_x_opp_d-center_y_opp_d
+        distance_factor_own=features.own_centrality
+        distance_factor_opp=features.opp_centrality
     else:
         distance_factor_own=0
         distance_factor_opp=0
-        
-    
-
-
     
-    score=own_moves-opp_moves+distance_factor_own-distance_factor_opp
+    score=features.own_moves-features.opp_moves+distance_factor_own-distance_factor_opp
     return score
 
 
 def my_improved_score(game, player):
     
-    if game.is_loser(player):
-        return float("-inf")
-
-    if game.is_winner(player):
-        return float("inf")
+    features = extract_features(game, player, two_step=False)
     
-    threshold=8    
-    own_moves = count_legal_moves(game, player,threshold)
-#    own_moves_testing = len(game.get_legal_moves(player))
-    #replaces the is_loser call. gaining time most of the time
-#    if own_moves==0 and game.active_player==player:
-#        return float("-inf")
-#    
-    opp_moves = count_legal_moves(game, game.get_opponent(player),threshold)
-#    opp_moves_testing = len(game.get_legal_moves(game.get_opponent(player)))   
-    #replaces the is_winner call. gaining time most of the time
-#    if opp_moves==0 and game.inactive_player==player:
-#        return float("+inf")
+    if features.terminal:
+        return features.terminal*float("inf")
 
-    score=8*own_moves-opp_moves
+    score=8*features.own_moves-features.opp_moves
     return float(score)
 
 def survive_score(game, player):
     
+    #only tells whether each player can still move, so the move counts stop
+    #at the first legal move instead of going through extract_features()
     threshold=1    
     own_moves = count_legal_moves(game, player,threshold)
-#    own_moves_testing = len(game.get_legal_moves(player))
-    #replaces the is_loser call. gaining time most of the time
     if own_moves==0 and game.active_player==player:
         return float("-inf")
     
     opp_moves = count_legal_moves(game, game.get_opponent(player),threshold)
-#    opp_moves_testing = len(game.get_legal_moves(game.get_opponent(player)))   
-    #replaces the is_winner call. gaining time most of the time
     if opp_moves==0 and game.inactive_player==player:
         return float("+inf")
 
@@ -237,13 +430,15 @@ def opp_open_move_score(game, player):
     float
         The heuristic value of the current game state
     """
-    if game.is_loser(player):
-        return float("-inf")
-
-    if game.is_winner(player):
+    #only the opponent's moves are counted; the player only has to have one
+    opp_moves = len(game.get_legal_moves(game.get_opponent(player)))
+    if game.active_player == player:
+        if not count_legal_moves(game, player, 1):
+            return float("-inf")
+    elif not opp_moves:
         return float("inf")
 
-    return 8-float(len(game.get_legal_moves(game.get_opponent(player))))
+    return 8-float(opp_moves)
 
 def free_space(game, player):
     """outputs a score
@@ -275,21 +470,173 @@ def free_space(game, player):
     
     r, c = game.get_player_location(player)
 
-    blank_spaces=game.get_blank_spaces()
-    
-    directions = [(-1, 1), (0, 1), (1, 1), (-1, 0),
-                  (1, 0),  (-1, -1), (0, -1),  (-1, -1)]
-#                  (-2,2),(-1,2),(0,2),(1,2),(2,2),
-#                  (-2,1),(2,1),(-2,0),(2,0),
-#                  (-2,-1),(2,-1),
-#                  (-2,-2),(-1,-2),(0,-2),(1,-2),(2,-2)]
-
-    for dr, dc in directions:
-        if (r+dr, c+dc) in blank_spaces:
+    move_is_legal=game.move_is_legal
+    for move in board_tables(game.width, game.height).king_neighbors[c*game.height+r]:
+        if move_is_legal(move):
             count=count+1    
 
     return count    
     
+def territory_score(game, player):
+    """outputs a score equal to the "improved" score plus the difference in
+    the number of blank cells each player can still reach. The reachable
+    regions are read from the knight-move components the board maintains
+    incrementally, so there is no flood fill at every leaf as long as the
+    components of the root are computed first (`CustomPlayer.get_move()` does
+    it for the score functions that set needs_components, see
+    score_fn_needs()). Once the players are separated the region sizes
+    dominate the score.
+
+    Parameters
+    ----------
+    game : `isolation.Board`
+        An instance of `isolation.Board` encoding the current state of the
+        game (e.g., player locations and blocked cells).
+
+    player : hashable
+        One of the objects registered by the game object as a valid player.
+        (i.e., `player` should be either game.__player_1__ or
+        game.__player_2__).
+
+    Returns
+    ----------
+    float
+        The heuristic value of the current game state
+    """
+    features = extract_features(game, player, two_step=False)
+    if features.terminal:
+        return features.terminal*float("inf")
+
+    own_region = game.reachable_count(player)
+    opp_region = game.reachable_count(game.get_opponent(player))
+    return float(features.own_moves - features.opp_moves + own_region - opp_region)
+
+territory_score.needs_components = True
+
+def score_fn_needs(score_fn, attribute):
+    """Return whether the score function, or a function it wraps (through
+    functools.partial or `EvalCache`), sets `attribute` to True.
+
+    Score functions opt in with needs_hash_key or needs_components to have
+    `CustomPlayer.get_move()` compute `Board.hash_key` or
+    `Board.components` at the root of the search, after which every child
+    board updates them incrementally instead of computing them again.
+    """
+    while score_fn is not None:
+        if getattr(score_fn, attribute, False):
+            return True
+        score_fn = getattr(score_fn, "func", None) or \
+            getattr(score_fn, "score_fn", None)
+    return False
+
+# fields of `Features` a weighted heuristic can weigh, in the order of the
+# weights tuple of _phase_score()
+WEIGHTED_FEATURES = Features._fields[1:]
+
+def _phase_score(weights, game, player):
+    """Score `game` for `player` as the weighted sum of the
+    `extract_features()` features, with `weights` in the order of
+    `WEIGHTED_FEATURES`; the features whose weight is zero are not
+    computed."""
+    (own_w, opp_w, own_centrality_w, opp_centrality_w, own_two_step_w,
+     opp_two_step_w, blank_w) = weights
+    opponent = game.get_opponent(player)
+    own_moves = game.get_legal_moves(player)
+    opp_moves = game.get_legal_moves(opponent)
+    if game.active_player == player:
+        if not own_moves:
+            return float("-inf")
+    elif not opp_moves:
+        return float("inf")
+
+    total = 0.
+    if own_w:
+        total += own_w*len(own_moves)
+    if opp_w:
+        total += opp_w*len(opp_moves)
+    if not (own_centrality_w or opp_centrality_w or own_two_step_w or
+            opp_two_step_w or blank_w):
+        return total
+
+    height = game.height
+    tables = board_tables(game.width, height)
+    blank_count = game.width*height - game.move_count
+    if blank_w:
+        total += blank_w*blank_count
+    for moves, location, centrality_w, two_step_w in (
+            (own_moves, game.get_player_location(player), own_centrality_w,
+             own_two_step_w),
+            (opp_moves, game.get_player_location(opponent), opp_centrality_w,
+             opp_two_step_w)):
+        #before the first move every blank cell is a legal move
+        if location is None:
+            total += two_step_w*blank_count
+            continue
+        if centrality_w:
+            total += centrality_w*tables.centrality[location[1]*height + location[0]]
+        if two_step_w:
+            total += two_step_w*two_step_count(moves, tables.neighbors, height,
+                                               game.move_is_legal)
+    return total
+
+def _weighted_score(phases, game, player):
+    """Score `game` with the scorer of the first (move_count, scorer) pair of
+    `phases` whose move_count is below game.move_count."""
+    move_count = game.move_count
+    for threshold, scorer in phases:
+        if move_count > threshold:
+            return scorer(game, player)
+
+def weighted_heuristic(weights, phases=()):
+    """Return an evaluation function scoring positions as a weighted sum of
+    the `extract_features()` features, e.g. the equivalent of
+    improved_score_with_distance_factor2:
+
+        heuristic = weighted_heuristic({"own_moves": 1, "opp_moves": -1},
+                                       phases=[(20, {"own_centrality": 1,
+                                                     "opp_centrality": -1})])
+        player = CustomPlayer(score_fn=heuristic)
+
+    Each phase gets its own scorer, a functools.partial of _phase_score()
+    over its weights, which only computes the features whose weight is not
+    zero (the two-step mobility, the costly one, is only counted when
+    weighed). With several phases, a partial of _weighted_score() picks the
+    scorer of the phase; with one, its scorer is the evaluation function
+    itself. Either way a call goes straight to a module level function, and
+    the heuristic can be pickled and sent to the worker processes of the
+    search.
+
+    Parameters
+    ----------
+    weights : dict<str, float>
+        Weight of each feature (any field of `Features` but terminal).
+        Finished games always score -inf or inf.
+
+    phases : list<(int, dict<str, float>)> (optional)
+        (move_count, weights) pairs: once game.move_count is greater than
+        move_count, the given weights replace the ones of the earlier phases
+        (the other features keep their weight).
+
+    Returns
+    ----------
+    functools.partial
+    """
+    scorers = []
+    current = {}
+    for move_count, phase_weights in [(-1, weights)] + sorted(phases, key=lambda p: p[0]):
+        for name in phase_weights:
+            if name not in WEIGHTED_FEATURES:
+                raise ValueError("unknown feature: {}".format(name))
+        current = dict(current, **phase_weights)
+        scorers.append((move_count, functools.partial(
+            _phase_score, tuple(current.get(name, 0)
+                                for name in WEIGHTED_FEATURES))))
+    if len(scorers) == 1:
+        return scorers[0][1]
+    #later phases first, so the first threshold below move_count wins
+    scorers.reverse()
+    return functools.partial(_weighted_score, tuple(scorers))
+
 
 def custom_score(game, player):
     """Calculate the heuristic value of a game state from the point of view
@@ -342,6 +689,682 @@ def best_score_move(scores,maximizing_player):
     return best_score,best_move
 
 
+# bound types of a transposition table entry
+EXACT, LOWER_BOUND, UPPER_BOUND = 0, 1, 2
+
+
+class TranspositionTable:
+    """Fixed-size hash table of search results keyed by `Board.hash_key`.
+
+    Each bucket has two slots: a depth-preferred slot that only gives way to
+    results searched at least as deep (or to any result once its entry is
+    left over from an earlier search, see `new_search()`), and an
+    always-replace slot that takes everything else. Entries are tuples
+    (key, depth, score, bound, move, generation) where bound is one of EXACT,
+    LOWER_BOUND or UPPER_BOUND.
+
+    Parameters
+    ----------
+    size_mb : float (optional)
+        Approximate memory cap of the table in megabytes.
+    """
+
+    # rough size of one entry (tuple, 64-bit key, float score and list slot)
+    ENTRY_BYTES = 160
+
+    def __init__(self, size_mb=16.):
+        self.size = max(1, int(size_mb * 2**20 / (2 * self.ENTRY_BYTES)))
+        self.clear()
+
+    def clear(self):
+        """Remove every entry from the table."""
+        self.depth_slots = [None] * self.size
+        self.recent_slots = [None] * self.size
+        self.generation = 0
+
+    def new_search(self):
+        """Keep the entries for a search from a new root, but let the
+        results of the previous searches be replaced by shallower ones."""
+        self.generation += 1
+
+    def probe(self, key):
+        """Return the entry stored for `key`, or None if there is none."""
+        idx = key % self.size
+        entry = self.depth_slots[idx]
+        if entry is not None and entry[0] == key:
+            return entry
+        entry = self.recent_slots[idx]
+        if entry is not None and entry[0] == key:
+            return entry
+        return None
+
+    def store(self, key, depth, score, bound, move):
+        """Record the result of searching the position `key` to `depth`."""
+        idx = key % self.size
+        entry = (key, depth, score, bound, move, self.generation)
+        current = self.depth_slots[idx]
+        if current is None or current[0] == key or depth >= current[1] or \
+           current[5] != self.generation:
+            self.depth_slots[idx] = entry
+        else:
+            self.recent_slots[idx] = entry
+
+
+class SharedTranspositionTable:
+    """Transposition table stored in a `multiprocessing.shared_memory` block
+    so that it can be shared without locks by the processes of a lazy SMP
+    search. It has the same interface and replacement scheme as
+    `TranspositionTable`.
+
+    Each entry is packed in three 64-bit words: key ^ score ^ data, score
+    (the bits of the float) and data (depth, bound, generation and move). A
+    reader only accepts an entry whose first word matches the other two, so
+    an entry torn by two processes writing at the same time reads as a miss.
+    The first two words of the block hold the search epoch (see
+    `new_epoch()`) and the generation shared by every process.
+
+    Pickling the table (e.g. to send it to a worker process) only keeps the
+    name of the block, which the copy attaches to.
+
+    Parameters
+    ----------
+    size_mb : float (optional)
+        Size of the shared memory block in megabytes.
+    """
+
+    ENTRY_WORDS = 3
+    HEADER_WORDS = 2
+    MASK = 2**64 - 1
+
+    def __init__(self, size_mb=16., name=None):
+        self.size = max(1, int(size_mb * 2**20 / (2 * 8 * self.ENTRY_WORDS)))
+        nbytes = 8 * (self.HEADER_WORDS + 2 * self.ENTRY_WORDS * self.size)
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.words = self.shm.buf.cast('Q')
+        if self.owner:
+            self.clear()
+
+    def __getstate__(self):
+        return {'size': self.size, 'name': self.shm.name}
+
+    def __setstate__(self, state):
+        size_mb = state['size'] * 2 * 8 * self.ENTRY_WORDS / 2**20
+        self.__init__(size_mb, state['name'])
+
+    @property
+    def epoch(self):
+        """Number of the current lazy SMP iteration."""
+        return self.words[0]
+
+    def new_epoch(self):
+        """Start a new lazy SMP iteration, which tells the helpers still
+        searching the previous one to stop, and return its number."""
+        self.words[0] = (self.words[0] + 1) & self.MASK
+        return self.words[0]
+
+    @property
+    def generation(self):
+        return self.words[1]
+
+    def clear(self):
+        """Remove every entry from the table."""
+        #zero the entries in place rather than copying a block of zeros over
+        #them; the ctypes view is released at once so that close() works
+        offset = 8 * self.HEADER_WORDS
+        entries = (ctypes.c_char * (len(self.shm.buf) - offset)).from_buffer(
+            self.shm.buf, offset)
+        ctypes.memset(entries, 0, len(entries))
+        del entries
+        self.words[1] = 0
+
+    def new_search(self):
+        """Keep the entries for a search from a new root, but let the
+        results of the previous searches be replaced by shallower ones."""
+        self.words[1] = (self.words[1] + 1) & 0xffff
+
+    def close(self):
+        """Detach this process from the shared memory block."""
+        if getattr(self, 'words', None) is not None:
+            self.words.release()
+            self.words = None
+            self.shm.close()
+
+    def __del__(self):
+        self.close()
+
+    def unlink(self):
+        """Remove the shared memory block once every process is done with
+        it (the processes that are attached keep their mapping)."""
+        if self.owner:
+            self.shm.unlink()
+            self.owner = False
+
+    def read(self, slot):
+        """Return the entry stored in `slot` (None if empty or torn)."""
+        words = self.words
+        idx = self.HEADER_WORDS + self.ENTRY_WORDS * slot
+        check, bits, data = words[idx], words[idx + 1], words[idx + 2]
+        if not data:
+            return None
+        key = check ^ bits ^ data
+        score = struct.unpack('<d', struct.pack('<Q', bits))[0]
+        move = (data >> 26) & 0x1ffff
+        if move:
+            move = ((move - 1) >> 8, (move - 1) & 0xff)
+        else:
+            move = None
+        return (key, data & 0xff, score, (data >> 8) & 3, move,
+                (data >> 10) & 0xffff)
+
+    def probe(self, key):
+        """Return the entry stored for `key`, or None if there is none."""
+        slot = 2 * (key % self.size)
+        entry = self.read(slot)
+        if entry is not None and entry[0] == key:
+            return entry
+        entry = self.read(slot + 1)
+        if entry is not None and entry[0] == key:
+            return entry
+        return None
+
+    def store(self, key, depth, score, bound, move):
+        """Record the result of searching the position `key` to `depth`."""
+        slot = 2 * (key % self.size)
+        generation = self.words[1]
+        current = self.read(slot)
+        if not (current is None or current[0] == key or depth >= current[1] or
+                current[5] != generation):
+            slot += 1
+
+        data = 1 << 63 | min(depth, 0xff) | bound << 8 | generation << 10
+        if move is not None:
+            data |= ((move[0] << 8 | move[1]) + 1) << 26
+        bits = struct.unpack('<Q', struct.pack('<d', score))[0]
+        idx = self.HEADER_WORDS + self.ENTRY_WORDS * slot
+        self.words[idx] = key ^ bits ^ data
+        self.words[idx + 1] = bits
+        self.words[idx + 2] = data
+
+
+class MoveOrdering:
+    """Killer-move and history heuristics used to order the moves searched
+    at each alpha-beta node.
+
+    Killer moves are the last two moves that caused a cutoff at the same ply
+    (plies are counted with `Board.move_count`, so they stay valid across the
+    iterations of iterative deepening). The history table scores each
+    (player, destination cell) pair by the number and depth of the cutoffs it
+    caused anywhere in the tree.
+    """
+
+    def __init__(self):
+        self.killers = []
+        self.history = {}
+
+    def clear(self):
+        """Forget all killer moves and history scores."""
+        self.killers = []
+        self.history = {}
+
+    def age(self):
+        """Halve the history scores so that the cutoffs found in the next
+        search weigh more than the ones found from an earlier root."""
+        self.history = {key: value // 2
+                        for key, value in self.history.items() if value > 1}
+
+    def order(self, game, legal_moves, first_move=None):
+        """Return the legal moves of the active player sorted with
+        `first_move` (e.g. the transposition table move) first, then the
+        killer moves of this ply, then the other moves by history score.
+        """
+        history = self.history
+        player = game.active_player
+        ply = game.move_count
+        killers = self.killers[ply] if ply < len(self.killers) else ()
+
+        def priority(move):
+            if move == first_move:
+                return float("inf")
+            if move in killers:
+                return 2**60 - killers.index(move)
+            return history.get((player, move), 0)
+
+        return sorted(legal_moves, key=priority, reverse=True)
+
+    def record_cutoff(self, game, move, depth):
+        """Record that `move` of the active player caused a cutoff when
+        searched with `depth` plies remaining."""
+        ply = game.move_count
+        if ply >= len(self.killers):
+            self.killers.extend([] for _ in range(ply + 1 - len(self.killers)))
+        killers = self.killers[ply]
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[2:]
+
+        key = (game.active_player, move)
+        self.history[key] = self.history.get(key, 0) + depth * depth
+
+
+class EvalCache:
+    """Bounded cache of the scores of an evaluation function, keyed by
+    (`Board.hash_key`, player), that can be passed to CustomPlayer as its
+    `score_fn` so that transposed leaves and the leaves searched again by
+    every iteration of iterative deepening are only evaluated once:
+
+        CustomPlayer(score_fn=EvalCache(custom_score, capacity=2**16))
+
+    Parameters
+    ----------
+    score_fn : callable
+        The evaluation function to cache, called as score_fn(game, player).
+
+    capacity : int (optional)
+        Number of scores kept before the oldest ones are evicted.
+
+    policy : {'lru', 'clock'} (optional)
+        Eviction policy: 'lru' evicts the least recently used score, 'clock'
+        approximates it by sweeping a hand over the slots and evicting the
+        first score not used since the hand last passed it, which avoids
+        reordering the entries at every hit.
+    """
+
+    # every lookup hashes the board, see score_fn_needs()
+    needs_hash_key = True
+
+    def __init__(self, score_fn, capacity=2**16, policy='lru'):
+        if policy not in ('lru', 'clock'):
+            raise ValueError("policy must be 'lru' or 'clock'")
+        self.score_fn = score_fn
+        self.capacity = capacity
+        self.policy = policy
+        self.clear()
+
+    def clear(self):
+        """Remove every score from the cache and reset the counters."""
+        self.hits = 0
+        self.misses = 0
+        if self.policy == 'lru':
+            self.scores = collections.OrderedDict()
+        else:
+            self.slots = {}
+            self.keys = [None] * self.capacity
+            self.values = [None] * self.capacity
+            self.referenced = bytearray(self.capacity)
+            self.hand = 0
+
+    def __len__(self):
+        return len(self.scores if self.policy == 'lru' else self.slots)
+
+    def __call__(self, game, player):
+        key = (game.hash_key, player)
+        if self.policy == 'lru':
+            scores = self.scores
+            score = scores.get(key)
+            if score is not None:
+                scores.move_to_end(key)
+                self.hits += 1
+                return score
+            self.misses += 1
+            score = scores[key] = self.score_fn(game, player)
+            if len(scores) > self.capacity:
+                scores.popitem(last=False)
+            return score
+
+        idx = self.slots.get(key)
+        if idx is not None:
+            self.referenced[idx] = 1
+            self.hits += 1
+            return self.values[idx]
+        self.misses += 1
+        score = self.score_fn(game, player)
+        if len(self.slots) < self.capacity:
+            idx = len(self.slots)
+        else:
+            #give every score used since the last sweep a second chance
+            while self.referenced[self.hand]:
+                self.referenced[self.hand] = 0
+                self.hand = (self.hand + 1) % self.capacity
+            idx = self.hand
+            self.hand = (idx + 1) % self.capacity
+            del self.slots[self.keys[idx]]
+        self.slots[key] = idx
+        self.keys[idx] = key
+        self.values[idx] = score
+        return score
+
+
+class SolverLimit(Exception):
+    """Raised when the endgame solver exceeds its node budget."""
+
+
+class EndgameSolver:
+    """Exact solver for the positions where the two players are separated,
+    i.e. no open cell can be reached by both of them any more.
+
+    Each player then walks alone in its own region, so the player to move
+    wins if and only if its longest knight walk is strictly longer than the
+    longest walk of its opponent. The longest walk of the player with the
+    smaller region is computed exactly by a depth-first search over cell
+    bitmasks (index = col * height + row) memoized on (cell, cells still
+    open); the other player only has to be shown to have (or not) a walk of
+    a given length, which a search trying the moves with the fewest onward
+    moves first usually finds at once. The memo does not depend on the rest
+    of the position, so it is kept across calls, with one memo per board
+    size since the cell numbering and the knight moves depend on it.
+
+    Parameters
+    ----------
+    max_nodes : int (optional)
+        Number of search nodes a single call may visit before giving up
+        (large regions can take exponential time). Regions given up on are
+        remembered and not tried again.
+
+    max_memo : int (optional)
+        Number of memoized walks kept before the memo is cleared.
+    """
+
+    def __init__(self, max_nodes=2000, max_memo=10**6):
+        self.max_nodes = max_nodes
+        self.max_memo = max_memo
+        # (width, height) -> (memo, unsolved) of that board size; memo and
+        # unsolved are the ones of the board size of the last call
+        self.memos = {}
+        self.memo = {}
+        self.unsolved = set()
+        self.nodes = 0
+
+    def longest_path(self, masks, cell, open_mask):
+        """Return the largest number of moves a knight on `cell` can make
+        through the cells of `open_mask`."""
+        key = (cell, open_mask)
+        length = self.memo.get(key)
+        if length is not None:
+            return length
+        self.nodes += 1
+        if self.nodes > self.max_nodes:
+            raise SolverLimit()
+
+        length = 0
+        moves = masks[cell] & open_mask
+        while moves:
+            bit = moves & -moves
+            moves ^= bit
+            length = max(length, 1 + self.longest_path(masks, bit.bit_length() - 1,
+                                                       open_mask ^ bit))
+        self.memo[key] = length
+        return length
+
+    def has_path(self, masks, cell, open_mask, target):
+        """Return whether a knight on `cell` can make at least `target` moves
+        through the cells of `open_mask`."""
+        if target <= 0:
+            return True
+        length = self.memo.get((cell, open_mask))
+        if length is not None:
+            return length >= target
+        if bin(open_mask).count("1") < target:
+            return False
+        self.nodes += 1
+        if self.nodes > self.max_nodes:
+            raise SolverLimit()
+
+        moves = []
+        candidates = masks[cell] & open_mask
+        while candidates:
+            bit = candidates & -candidates
+            candidates ^= bit
+            dest = bit.bit_length() - 1
+            moves.append((bin(masks[dest] & open_mask).count("1"), dest, bit))
+        for _, dest, bit in sorted(moves):
+            if self.has_path(masks, dest, open_mask ^ bit, target - 1):
+                return True
+        return False
+
+    def regions(self, game):
+        """Return the knight masks and the (cell, region) of the active and
+        the inactive player if the players of `game` are separated, or None
+        if they are not (or a player has not moved yet).
+
+        The regions are read from the knight-move components the board
+        keeps up to date (see `Board.components`), so a search that computed
+        them at its root does not flood the board again at every node.
+        """
+        if not game.players_separated():
+            return None
+
+        self.memo, self.unsolved = self.memos.setdefault(
+            (game.width, game.height), ({}, set()))
+        height = game.height
+        masks = board_tables(game.width, height).masks
+        regions = []
+        for player in (game.active_player, game.inactive_player):
+            r, c = game.get_player_location(player)
+            regions.append((c * height + r, game.reachable_region(player)))
+        return masks, regions[0], regions[1]
+
+    def exact_walk(self, masks, cell, region):
+        """Return the longest walk from `cell` in `region`, or None if it
+        takes more than max_nodes (now or in an earlier call)."""
+        if (cell, region) in self.unsolved:
+            return None
+        if len(self.memo) > self.max_memo:
+            self.memo.clear()
+        self.nodes = 0
+        try:
+            return self.longest_path(masks, cell, region)
+        except SolverLimit:
+            self.unsolved.add((cell, region))
+            return None
+
+    def solve(self, game):
+        """Return the score of `game` for the player to move (inf for a
+        proven win, -inf for a proven loss), or None if it is not solved."""
+        regions = self.regions(game)
+        if regions is None:
+            return None
+        masks, active, inactive = regions
+
+        #walk the smaller region exactly, then check whether the other player
+        #can walk (strictly) further
+        active_first = bin(active[1]).count("1") <= bin(inactive[1]).count("1")
+        small, large = (active, inactive) if active_first else (inactive, active)
+        walk = self.exact_walk(masks, *small)
+        if walk is None:
+            return None
+        target = walk if active_first else walk + 1
+        self.nodes = 0
+        try:
+            longer = self.has_path(masks, large[0], large[1], target)
+        except SolverLimit:
+            return None
+        active_wins = longer != active_first
+        return float("inf") if active_wins else float("-inf")
+
+    def best_move(self, game, legal_moves):
+        """Return the legal move starting the longest walk of the player to
+        move if the players of `game` are separated, or None otherwise (or
+        if the walks take more than max_nodes to compute)."""
+        regions = self.regions(game)
+        if regions is None:
+            return None
+        masks, (cell, region), _ = regions
+        if self.exact_walk(masks, cell, region) is None:
+            return None
+
+        height = game.height
+        best_move, best_length = None, -1
+        for r, c in legal_moves:
+            dest = c * height + r
+            length = self.memo[(dest, region ^ 1 << dest)]
+            if length > best_length:
+                best_move, best_length = (r, c), length
+        return best_move
+
+
+class TimeManager:
+    """Decides whether iterative deepening should start another iteration,
+    from the time the previous iterations took.
+
+    The cost of the next iteration is predicted as the time of the last one
+    times the effective branching factor (the geometric mean of the growth
+    of the last iteration times). An iteration is only started when it is
+    predicted to finish in the time left, or in `extension` times the time
+    left for a critical position: the best move changed in the last
+    iteration or its score dropped by more than `critical_drop`. The partial
+    results of an iteration cut by the timer are then still used (see
+    `CustomPlayer.iterative_deepening`).
+
+    Parameters
+    ----------
+    critical_drop : float (optional)
+        Score drop between two iterations (in units of the evaluation
+        function) that makes the position critical.
+
+    extension : float (optional)
+        How much longer than the time left an iteration may be predicted to
+        take in a critical position and still be started.
+    """
+
+    # iterations faster than this (in milliseconds) are too noisy to measure
+    # the branching factor
+    MIN_TIME = 0.5
+
+    def __init__(self, critical_drop=1., extension=2.):
+        self.critical_drop = critical_drop
+        self.extension = extension
+        self.reset()
+
+    def reset(self):
+        """Forget the iterations of the previous search."""
+        self.times = []
+        self.scores = []
+        self.moves = []
+
+    def record(self, elapsed, score, move):
+        """Record that an iteration took `elapsed` milliseconds and found
+        `move` with `score`."""
+        self.times.append(elapsed)
+        self.scores.append(score)
+        self.moves.append(move)
+
+    def branching_factor(self):
+        """Return the effective branching factor of the last (up to three)
+        iterations, or None if they were too fast to tell."""
+        ratios = [t / prev for prev, t in zip(self.times[-4:-1], self.times[-3:])
+                  if prev >= self.MIN_TIME]
+        if not ratios:
+            return None
+        product = 1.
+        for ratio in ratios:
+            product *= ratio
+        return max(1., product ** (1. / len(ratios)))
+
+    def critical(self):
+        """Whether the last iteration changed its mind about the position."""
+        if len(self.moves) < 2:
+            return False
+        return self.moves[-1] != self.moves[-2] or \
+            self.scores[-1] < self.scores[-2] - self.critical_drop
+
+    def should_continue(self, remaining):
+        """Whether the next iteration should be started with `remaining`
+        milliseconds left before the timeout."""
+        ebf = self.branching_factor()
+        if ebf is None:
+            return True
+        allowance = self.extension if self.critical() else 1.
+        return self.times[-1] * ebf <= remaining * allowance
+
+
+class BoardPickler(pickle.Pickler):
+    """Pickler that stores the players of a board as references to their
+    slot, so the board can be sent to another process without the players."""
+
+    def __init__(self, file, players):
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+        self.players = players
+
+    def persistent_id(self, obj):
+        for slot, player in enumerate(self.players):
+            if obj is player:
+                return slot
+        return None
+
+
+class BoardUnpickler(pickle.Unpickler):
+    """Unpickler that puts the given players back in the slots saved by
+    `BoardPickler`."""
+
+    def __init__(self, file, players):
+        super().__init__(file)
+        self.players = players
+
+    def persistent_load(self, pid):
+        return self.players[pid]
+
+
+def dump_board(game, player):
+    """Serialize `game` without its players; `load_board()` puts another
+    player object in the slot of `player` and a placeholder for the
+    opponent."""
+    buffer = io.BytesIO()
+    BoardPickler(buffer, (player, game.get_opponent(player))).dump(game)
+    return buffer.getvalue()
+
+
+def load_board(data, player, opponent="opponent"):
+    """Rebuild a board serialized by `dump_board()` for `player`."""
+    return BoardUnpickler(io.BytesIO(data), (player, opponent)).load()
+
+
+# copy of the CustomPlayer that owns the pool, in each worker process
+_worker_player = None
+
+
+def _release_player(pools, tt):
+    """Stop the worker pools of a CustomPlayer and remove the shared memory
+    block of its table, once it is closed or garbage collected."""
+    for pool in pools:
+        pool.terminate()
+        pool.join()
+    if isinstance(tt, SharedTranspositionTable):
+        tt.unlink()
+
+
+def _init_worker(data, root_epoch=None):
+    global _worker_player
+    player = pickle.loads(data)
+    player.processes = 0
+    player.pool = None
+    player.ponder = False
+    player.root_epoch = root_epoch
+    _worker_player = player
+
+
+def _search_root_move(data, move, depth, alpha, beta, end, search_id,
+                      fresh_tables, epoch):
+    game = load_board(data, _worker_player)
+    return _worker_player.search_subtree(game, move, depth, alpha, beta, end,
+                                         search_id, fresh_tables, epoch)
+
+
+def _helper_search(data, root_moves, depth, end, search_id, fresh_tables,
+                   epoch):
+    game = load_board(data, _worker_player)
+    _worker_player.helper_search(game, root_moves, depth, end, search_id,
+                                 fresh_tables, epoch)
+
+
+def _ponder_search(data, replies, end, epoch):
+    game = load_board(data, _worker_player)
+    _worker_player.ponder_search(game, replies, end, epoch)
+
+
 class CustomPlayer:
     """Game-playing agent that chooses a move using your evaluation function
     and a depth-limited minimax algorithm with alpha-beta pruning. You must
@@ -363,23 +1386,335 @@ class CustomPlayer:
         Flag indicating whether to perform fixed-depth search (False) or
         iterative deepening search (True).
 
-    method : {'minimax', 'alphabeta'} (optional)
-        The name of the search method to use in get_move().
+    method : {'minimax', 'alphabeta', 'pvs'} (optional)
+        The name of the search method to use in get_move(). 'pvs' is the
+        principal variation (NegaScout) variant of alpha-beta.
 
     timeout : float (optional)
         Time remaining (in milliseconds) when search is aborted. Should be a
         positive value large enough to allow the function to return before the
         timer expires.
+
+    inplace : boolean (optional)
+        Flag indicating whether get_move() should search on a single private
+        copy of the board using push_move()/pop_move() (True) instead of
+        creating a new board with forecast_move() at every node (False).
+
+    table_mb : float (optional)
+        Memory cap (in megabytes) of the transposition table used by
+        alphabeta(); 0 disables the table.
+
+    move_ordering : boolean (optional)
+        Flag indicating whether alphabeta() should order the moves with the
+        killer-move and history heuristics.
+
+    aspiration_window : float (optional)
+        Half-width of the window around the previous score that each
+        iterative deepening iteration of alphabeta/pvs starts with; 0 starts
+        every iteration with an infinite window.
+
+    aspiration_growth : float (optional)
+        Factor applied to the half-width each time an iteration fails high or
+        low and has to be searched again with a wider window.
+
+    adaptive_polling : boolean (optional)
+        Flag indicating whether the search should only read the clock every
+        N nodes, with N derived from the measured search speed so that a poll
+        still happens well within the timeout margin (True), instead of at
+        every node (False).
+
+    persistent : boolean (optional)
+        Flag indicating whether the transposition table, the move ordering
+        tables and the principal variation should be kept from one
+        get_move() call to the next of the same game (True) instead of being
+        cleared before every search (False).
+
+    ponder : boolean (optional)
+        Flag indicating whether the agent should keep searching in a
+        background process while the opponent thinks, on the positions after
+        the most likely replies to the move it just returned. The results go
+        to a `SharedTranspositionTable` (of table_mb megabytes, 16 when
+        table_mb is 0) and pondering implies persistent, so the next
+        get_move() starts from that work. The search runs in its own process
+        so that it never holds the interpreter of an opponent playing in the
+        same process; it is stopped by close_pool().
+
+    ponder_moves : int (optional)
+        Number of opponent replies, best first, that are searched deeper than
+        one ply while pondering.
+
+    processes : int (optional)
+        Number of worker processes helping the search; 0 searches everything
+        in this process. The pool is started with the player and reused for
+        every move, and can be stopped with close_pool().
+
+    parallel : {'root', 'smp'} (optional)
+        How the worker processes help: 'root' splits the root moves among
+        them (see search_root_parallel()), 'smp' has them search the same
+        root as helpers sharing a `SharedTranspositionTable` with this
+        process (lazy SMP, see search_root_smp()).
+
+    The worker processes get a pickled copy of the player, so with
+    processes or ponder the score function must be picklable (a module
+    level function, functools.partial, `EvalCache`, weighted_heuristic()...).
+    They and the shared memory block of a shared table are released by
+    close_pool(), or when the player is garbage collected.
+
+    time_management : boolean (optional)
+        Flag indicating whether iterative deepening should let a
+        `TimeManager` decide when to stop starting new iterations, and use
+        the partial results of an iteration cut by the timer (True), instead
+        of deepening until the timer runs out (False).
+
+    endgame : boolean (optional)
+        Flag indicating whether positions where the players are separated
+        should be solved exactly by an `EndgameSolver`: get_move() then plays
+        the longest walk at once, and alphabeta/pvs score such nodes as
+        proven wins or losses instead of searching them.
     """
 
     def __init__(self, search_depth=3, score_fn=custom_score,
-                 iterative=True, method='minimax', timeout=10.):
+                 iterative=True, method='minimax', timeout=10., inplace=False,
+                 table_mb=0., move_ordering=False, aspiration_window=0.,
+                 aspiration_growth=4., adaptive_polling=False,
+                 persistent=False, ponder=False, ponder_moves=3, processes=0,
+                 parallel='root', time_management=False, endgame=False):
+        if method not in ('minimax', 'alphabeta', 'pvs'):
+            raise ValueError("method must be 'minimax', 'alphabeta' or 'pvs'")
+        if parallel not in ('root', 'smp'):
+            raise ValueError("parallel must be 'root' or 'smp'")
         self.search_depth = search_depth
         self.iterative = iterative
         self.score = score_fn
         self.method = method
         self.time_left = None
         self.TIMER_THRESHOLD = timeout
+        self.inplace = inplace
+        self.tt = TranspositionTable(table_mb) if table_mb > 0 else None
+        if ponder or (processes > 0 and parallel == 'smp'):
+            self.tt = SharedTranspositionTable(table_mb if table_mb > 0 else 16.)
+        self.ordering = MoveOrdering() if move_ordering else None
+        self.aspiration_window = aspiration_window
+        self.aspiration_growth = aspiration_growth
+        # set whenever the search stops at the depth limit rather than at the
+        # end of the game, i.e. when searching deeper could change the result
+        self.depth_limit_reached = False
+        self.completed_depth = None
+        # best line found by the last completed 'pvs' search (root move first)
+        self.principal_variation = []
+        # move_count -> best line found from the node searched at that ply
+        self.pv_table = {}
+        # nodes visited in the current search, and node count at which the
+        # search must next read the clock (see poll_timer())
+        self.adaptive_polling = adaptive_polling
+        self.nodes = 0
+        self.next_poll = 0
+        self.poll_interval = 1
+        self.last_poll = None
+        # measured search speed in nodes per millisecond
+        self.node_rate = 0.
+        # game (size and players) and move_count of the last get_move() call,
+        # used to tell a new game from the next move of the same game
+        self.persistent = persistent or ponder
+        self.last_game = None
+        self.last_move_count = None
+        # process searching while the opponent thinks, the background search
+        # started when get_move() returns, and the hash keys of the positions
+        # it searches
+        self.ponder = ponder
+        self.ponder_moves = ponder_moves
+        self.ponder_pool = None
+        self.ponder_task = None
+        self.ponder_keys = set()
+        # whether the position of the last get_move() call was pondered on,
+        # and the (depth, score) of the pondered result iterative deepening
+        # starts from
+        self.ponder_hit = False
+        self.ponder_start = None
+        # milliseconds the last get_move() call was given, which also bounds
+        # the time spent pondering
+        self.move_time = None
+        # number of the current search, and whether its tables started empty,
+        # so that the workers know when to clear or age their own tables
+        self.search_id = 0
+        self.fresh_tables = True
+        self.time_manager = TimeManager() if time_management else None
+        self.endgame = EndgameSolver() if endgame else None
+        self.processes = processes
+        self.parallel = parallel
+        self.pool = None
+        # number of the current root split iteration, shared with the
+        # workers, which drop the tasks of any other iteration
+        self.root_epoch = None
+        # the workers get a copy rather than the player itself, which the
+        # pools would otherwise keep alive (they hold on to their initargs)
+        data = pickle.dumps(self) if processes > 0 or ponder else None
+        if processes > 0:
+            self.root_epoch = multiprocessing.RawValue('Q', 0)
+            self.pool = multiprocessing.Pool(processes, _init_worker,
+                                             (data, self.root_epoch))
+        if ponder:
+            self.ponder_pool = multiprocessing.Pool(1, _init_worker, (data,))
+        self.finalizer = weakref.finalize(
+            self, _release_player,
+            [pool for pool in (self.pool, self.ponder_pool) if pool is not None],
+            self.tt)
+
+    def __getstate__(self):
+        # the pools, the pondering task and the timer cannot be pickled and
+        # are not needed by a copy of the player (e.g. in a worker process)
+        state = self.__dict__.copy()
+        state['pool'] = None
+        state['ponder_pool'] = None
+        state['ponder_task'] = None
+        state['finalizer'] = None
+        state['time_left'] = None
+        # shared values can only be inherited by processes (see _init_worker)
+        state['root_epoch'] = None
+        return state
+
+    def close_pool(self):
+        """Stop the worker processes of the parallel search and of
+        pondering, if any, and release the shared memory block of a shared
+        table."""
+        self.stop_pondering()
+        self.finalizer()
+        self.pool = None
+        self.ponder_pool = None
+
+    def start_clock(self, time_left, epoch=None):
+        """Start the clock of a new search: `time_left` is the clock given to
+        get_move(), or with `epoch` the timeit.default_timer() deadline of a
+        worker task, which also runs out as soon as the epoch moves on from
+        `epoch` (`root_epoch` in a root split worker, the epoch of the shared
+        table otherwise).
+        """
+        if epoch is not None:
+            end=time_left
+            if self.parallel=='root' and self.root_epoch is not None:
+                root_epoch=self.root_epoch
+                time_left=lambda: -math.inf if root_epoch.value!=epoch else \
+                                  1000*(end-timeit.default_timer())
+            else:
+                tt=self.tt
+                time_left=lambda: -math.inf if tt.epoch!=epoch else \
+                                  1000*(end-timeit.default_timer())
+        self.time_left=time_left
+        self.nodes=0
+        self.next_poll=0
+        self.poll_interval=1
+        self.last_poll=None
+
+    def poll_timer(self):
+        """Read the clock and raise Timeout when less than TIMER_THRESHOLD
+        milliseconds are left, then schedule the next poll.
+
+        Without adaptive polling the clock is read at every node. Otherwise
+        the number of nodes until the next poll is derived from the measured
+        search speed so that it takes at most a quarter of TIMER_THRESHOLD
+        (and at most half of the time left above TIMER_THRESHOLD); it can
+        only double from one poll to the next, so a noisy measurement cannot
+        make the search overshoot the deadline.
+        """
+        time_left=self.time_left()
+        if time_left<self.TIMER_THRESHOLD:
+            raise Timeout()
+
+        if not self.adaptive_polling:
+            self.next_poll=self.nodes+1
+            return
+
+        if self.last_poll is not None:
+            last_nodes,last_time_left=self.last_poll
+            elapsed=last_time_left-time_left
+            if elapsed>0:
+                self.node_rate=(self.nodes-last_nodes)/elapsed
+        self.last_poll=(self.nodes,time_left)
+
+        budget=min(self.TIMER_THRESHOLD/4.,(time_left-self.TIMER_THRESHOLD)/2.)
+        interval=min(int(self.node_rate*budget),2*self.poll_interval)
+        self.poll_interval=max(1,interval)
+        self.next_poll=self.nodes+self.poll_interval
+
+    def reuse_search_state(self, game, legal_moves):
+        """Prepare the search state for a search from `game` in persistent
+        mode and return the root moves in the order they should be searched.
+
+        The transposition table, killer moves and history scores are kept
+        when `game` follows the position of the previous call in the same
+        game (the previous results are only aged), and cleared when a new
+        game is detected: another board size or other players, or a
+        move_count that did not increase. The move expected by the last
+        principal variation, if the opponent played the expected reply, or
+        else the transposition table move of the root is searched first.
+
+        On a ponder hit the generation is kept, since the entries written
+        while pondering already belong to this search (see
+        start_pondering()), and the pondered best move and depth are left in
+        `ponder_start` for iterative deepening to continue from.
+        """
+        this_game=(game.width,game.height,game.__player_1__,game.__player_2__)
+        same_game=this_game==self.last_game and \
+                  self.last_move_count is not None and \
+                  game.move_count>self.last_move_count
+        pv=self.principal_variation
+        expected=same_game and game.move_count==self.last_move_count+2 and \
+                 len(pv)>=3 and \
+                 game.get_player_location(game.inactive_player)==pv[1] and \
+                 game.get_player_location(game.active_player)==pv[0]
+        self.last_game=this_game
+        self.last_move_count=game.move_count
+        self.fresh_tables=not same_game
+
+        first_move=None
+        self.ponder_start=None
+        if same_game:
+            if self.tt is not None:
+                if not self.ponder_hit:
+                    self.tt.new_search()
+                entry=self.tt.probe(game.hash_key)
+                if entry is not None:
+                    first_move=entry[4]
+                    #a full window result of the pondering process
+                    if self.ponder_hit and entry[3]==EXACT and \
+                       entry[5]==self.tt.generation and first_move in legal_moves:
+                        self.ponder_start=(entry[1],entry[2])
+            if self.ordering is not None:
+                self.ordering.age()
+        else:
+            if self.tt is not None:
+                self.tt.clear()
+            if self.ordering is not None:
+                self.ordering.clear()
+            self.pv_table={}
+
+        if expected:
+            self.principal_variation=pv[2:]
+            if self.ponder_start is None:
+                first_move=pv[2]
+        else:
+            self.principal_variation=[]
+
+        if first_move in legal_moves:
+            legal_moves=[first_move]+[m for m in legal_moves if m!=first_move]
+        return legal_moves
+
+    def make_move(self, game, move):
+        """Return the board reached by applying `move` to `game`.
+
+        In inplace mode the move is pushed on `game` itself and must be taken
+        back with `unmake_move()` once the child has been searched; otherwise a
+        new board is returned and `game` is left untouched.
+        """
+        if self.inplace:
+            game.push_move(move)
+            return game
+        return game.forecast_move(move)
+
+    def unmake_move(self, game):
+        """Take back the move applied by `make_move()` in inplace mode."""
+        if self.inplace:
+            game.pop_move()
 
     def get_move(self, game, legal_moves, time_left):
         """Search for the best move from the available legal moves and return a
@@ -417,7 +1752,10 @@ class CustomPlayer:
             (-1, -1) if there are no available legal moves.
         """
 
-        self.time_left = time_left
+        #the background search writes to the table this search reads
+        self.stop_pondering()
+
+        self.start_clock(time_left)
 
         # TODO: finish this function!
 
@@ -427,102 +1765,443 @@ class CustomPlayer:
         if not legal_moves:
                return (-1, -1)
             #_, move = max([(self.score(game.forecast_move(m), self), m) for m in legal_moves])
-            
+
+        #nothing to choose
+        if len(legal_moves)==1:
+            return legal_moves[0]
+
+        #once the players are separated there is nothing left to search
+        if self.endgame is not None:
+            move=self.endgame.best_move(game, legal_moves)
+            if move is not None:
+                return move
+
+        #in inplace mode the whole search runs on one private board that
+        #moves are pushed on and popped from, so the caller's board is untouched
+        #(a timeout leaves the moves of the aborted line on the private board,
+        #so pondering starts from the caller's board)
+        root=game
+        if self.inplace:
+            game = game.copy()
+
+        #an evaluation cache hashes every leaf, and territory_score and the
+        #endgame solver read the knight-move components: compute them once
+        #at the root and let the children update them incrementally
+        if score_fn_needs(self.score, "needs_hash_key"):
+            game.hash_key
+        if self.endgame is not None or \
+           score_fn_needs(self.score, "needs_components"):
+            game.components
+
+        if self.ponder:
+            self.move_time=time_left()
+            self.ponder_hit=game.hash_key in self.ponder_keys
+
+        self.search_id+=1
+        if self.persistent:
+            legal_moves=self.reuse_search_state(game, legal_moves)
+        else:
+            #results from the previous move were searched from another root
+            #and are unlikely to be reached again, so start with an empty table
+            if self.tt is not None:
+                self.tt.clear()
+            if self.ordering is not None:
+                self.ordering.clear()
+            self.fresh_tables=True
+
+        if self.iterative:
+            best_move=self.iterative_deepening(game, legal_moves)
+        else:
+            #not iterative: search every root move at the provided search depth
+            #once we had a timeout here during an id_improved vs ab_null
+            #in that case use whatever root moves have been scored so far
+            scores=[]
+            try:
+                self.search_root(game, legal_moves, self.search_depth, scores)
+            except Timeout:
+                pass
+
+            #find the maximum score and corresponding move
+            if scores:
+                best_score,best_move=best_score_move(scores,True)
+            else:
+                best_move=legal_moves[0]
+
+        if self.ponder:
+            self.start_pondering(root, best_move)
+        return best_move
+
+    def start_pondering(self, game, move):
+        """Start searching in the pondering process the positions reached
+        after `move` and each reply of the opponent, until stop_pondering()
+        is called or the time of the last move has passed again.
+        """
+        board=game.forecast_move(move)
+        replies=board.get_legal_moves()
+        if not replies:
+            return
+
+        self.ponder_keys=set(board.forecast_move(m).hash_key for m in replies)
+        #the results are written with the generation of the next search, so
+        #that they are not the first entries replaced after a ponder hit
+        self.tt.new_search()
+        end=timeit.default_timer()+self.move_time/1000.
+        epoch=self.tt.new_epoch()
+        self.ponder_task=self.ponder_pool.apply_async(
+            _ponder_search,(dump_board(board, self),replies,end,epoch))
+
+    def stop_pondering(self):
+        """Stop the background search, if any, and wait for it to return."""
+        if self.ponder_task is not None:
+            #a new table epoch tells the pondering process to stop
+            self.tt.new_epoch()
+            self.ponder_task.wait()
+            self.ponder_task=None
+
+    def ponder_search(self, game, replies, end, epoch):
+        """Search the positions after each reply of the opponent in `game`
+        with increasing depth in the pondering process, until the time runs
+        out or the table epoch changes. The results only go to the shared
+        transposition table. The first iteration scores every reply; the
+        following ones only search the `ponder_moves` best replies for the
+        opponent.
+        """
+        self.start_clock(end,epoch)
+        pvs=self.method=="pvs"
+        depth=0
         try:
-            # The search method call (alpha beta or minimax) should happen in
-            # here in order to avoid timeout. The try/except block will
-            # automatically catch the exception raised by the search method
-            # when the timer gets close to expiring
-            
-            
+            while depth<(game.width*game.height):
+                self.depth_limit_reached=False
+                scores=[]
+                for m in replies:
+                    child=self.make_move(game,m)
+                    score,_=self.negamax(child,depth,-math.inf,math.inf,1,pvs)
+                    self.unmake_move(game)
+                    scores.append((score,m))
+                #the opponent's best replies are the worst ones for us
+                replies=[m for _,m in sorted(scores,key=lambda x: x[0])]
+                replies=replies[:self.ponder_moves]
+                if not self.depth_limit_reached:
+                    break
+                depth=depth+1
+        except Timeout:
+            pass
 
-            search_depth=self.search_depth
-            iterative=self.iterative
-            method=self.method
-            maximizing=True
-            
-            debug=False
-            
-            #depth level alphabeta with ordering should continue to
-            #record ordered scores/moves
-            ordering_depth=0
-            
-            #if it's iterative, we always start at search depth 0 and search indefinitely
-            #untill timeout (in fact we'll stop when the depth is more than the size
-            #of the grid. No point in search deeper.)
-            #if it's not iterative, we just search at the provided search depth
-            if iterative:
-                current_search_depth=0
-                
-                #dictionary of moves/scores used by the alphabeta with ordering function
-                best_scores_dict={}
-                #if fact with stop if depth is more than the size of the board
-                #no need to go indefinitely
-                while current_search_depth<(game.width*game.height):
+    def iterative_deepening(self, game, legal_moves):
+        """Search the root moves with increasing depth until the time runs
+        out, and return the best move of the last completed iteration.
+
+        Every iteration searches the root moves in the order of the scores of
+        the previous iteration, so the previous best move comes first. The
+        search stops early when the result is proven (a win is found, or every
+        move loses) or when no node of the last iteration was cut by the depth
+        limit, since searching deeper would give the same answer.
+
+        With a time manager, the search also stops when the next iteration is
+        not expected to finish in time, and when the timer cuts an iteration
+        its partial results are used if they prove that a root move is better
+        than the previous best move (which is searched first).
+
+        After a ponder hit (see `ponder_start`), the depth searched while
+        pondering counts as completed and the search continues one ply
+        deeper, with the pondered move as the best move so far.
+
+        Parameters
+        ----------
+        game : `isolation.Board`
+            An instance of `isolation.Board` encoding the current state of the
+            game (e.g., player locations and blocked cells).
+
+        legal_moves : list<(int, int)>
+            The legal moves of the active player (at least one).
+
+        Returns
+        -------
+        (int, int)
+            The best move found.
+        """
+        root_moves=list(legal_moves)
+        #used if the timeout occurs before the first iteration is completed
+        best_score,best_move=None,root_moves[0]
+        self.completed_depth=None
+        manager=self.time_manager
+        if manager is not None:
+            manager.reset()
+        scores=[]
+
+        depth=0
+        if self.ponder_start is not None:
+            #a search to depth d from the root is iteration d-1 here
+            depth,best_score=self.ponder_start
+            self.completed_depth=depth-1
+        try:
+            #no point searching deeper than the number of cells on the board
+            while depth<(game.width*game.height):
+                #aspiration window: expect the score of the previous iteration
+                #and widen the window on the failing side until the score
+                #falls inside it
+                alpha,beta=float("-inf"),float("inf")
+                delta=self.aspiration_window
+                if delta and depth>0 and self.method!="minimax" and \
+                   abs(best_score)!=float("inf"):
+                    alpha,beta=best_score-delta,best_score+delta
+
+                start=self.time_left()
+                while True:
+                    self.depth_limit_reached=False
                     scores=[]
-                    for m in legal_moves:
-                        
-
-                        if method=="alphabeta":
-                            #use alphabeta with ordering depending on ordering_depth value
-                            if ordering_depth>0:
-                                score,move=self.alphabeta_with_ordering(game.forecast_move(m),current_search_depth,current_search_depth,ordering_depth,best_scores_dict,str(m),float("-inf"),float("+inf"),not  maximizing)
-                            else:
-                                score,move=self.alphabeta(game.forecast_move(m),current_search_depth,float("-inf"),float("+inf"),not  maximizing)
-                        else:                            
-                            score,move=self.minimax(game.forecast_move(m), current_search_depth,not maximizing)
-
-                            
-                        scores.append([score,m])
-                        best_scores_dict[m]=scores
-                                        
-                    #copy the scores before they are reinitialized in the next iteration
-                    #we'll use those scores in case of timeout
-                    #better to use the scores from a lower search depth than the partial scores
-                    #of one higher search depth
-                    #(the timeout could even occur while we don't even have evaluated one move
-                    #in which case scores would be empty)
-                    last_scores=scores
-                    current_search_depth=current_search_depth+1
-                                                    
-            #not iterative
-            else:
-                
-                #once we had a timeout here during an id_improved vs ab_null
-                #maybe should check if something is wrong as it's not supposed to happen
-                last_scores=[] 
-                for m in legal_moves:
-                    if method=="alphabeta":
-                        score,move=self.alphabeta(game.forecast_move(m), search_depth,float("-inf"),float("+inf"),not maximizing)
+                    self.search_root(game, root_moves, depth, scores, alpha, beta)
+                    #stable sort: on ties the previous order is kept, so the move
+                    #picked by best_score_move (the first best) comes first,
+                    #and the moves not searched after a fail high stay last
+                    searched=[m for _,m in scores]
+                    root_moves=[m for _,m in sorted(scores,key=lambda x: -x[0])]+ \
+                               [m for m in root_moves if m not in searched]
+                    score,move=best_score_move(scores,True)
+                    if score<=alpha and alpha!=float("-inf"):
+                        delta=delta*self.aspiration_growth
+                        alpha=score-delta
+                    elif score>=beta and beta!=float("inf"):
+                        delta=delta*self.aspiration_growth
+                        beta=score+delta
                     else:
-                        score,move=self.minimax(game.forecast_move(m), search_depth,not maximizing)                    
-                    last_scores.append([score,m])
-                    
-                #find the maximum score and corresponding move
-                best_score,best_move=best_score_move(last_scores,maximizing)
-                return best_move
-            if debug:
-                print("scores",last_scores)
-                print("depth",current_search_depth)
-                        
+                        break
+
+                best_score,best_move=score,move
+                self.completed_depth=depth
+
+                if best_score==float("inf") or best_score==float("-inf"):
+                    break
+                if not self.depth_limit_reached:
+                    break
+
+                if manager is not None:
+                    manager.record(start-self.time_left(),best_score,best_move)
+                    if not manager.should_continue(self.time_left()-self.TIMER_THRESHOLD):
+                        break
+
+                depth=depth+1
+
         except Timeout:
-            # Handle any actions required at timeout, if necessary            
-            if debug:
-                print("scores",last_scores)
-                print("depth",current_search_depth)
-                
-            best_score,best_move=best_score_move(last_scores,maximizing)
-            return best_move
-            pass
+            #better to use the scores from a lower search depth than the partial scores
+            #of one higher search depth, unless they show that a move beats
+            #the previous best move, which was searched first. That only holds
+            #when the first score is exact: outside the aspiration window it
+            #is a bound, and so are the scores of the other moves
+            if manager is not None and len(scores)>1 and \
+               alpha<scores[0][0]<beta:
+                score,move=best_score_move(scores,True)
+                if score>scores[0][0]:
+                    best_move=move
 
-        #Return the best move from the last completed search iteration
-        #(we may not have timeout because we don't really search indefinitely. We stop 
-        #is search depth is more than the board size)
-        best_score,best_move=best_score_move(last_scores,maximizing)
         return best_move
 
+    def search_root(self, game, root_moves, depth, scores=None,
+                    alpha=float("-inf"), beta=float("inf")):
+        """Search each root move to the given depth with the configured method
+        and return the list of [score, move] pairs in root move order.
+
+        For alphabeta and pvs the best score found so far is passed down as
+        alpha, so the other root moves only have to be searched well enough to
+        show that they are not better; their scores are then upper bounds.
+        With a narrower [alpha, beta] window (see `aspiration_window`) the
+        search stops at the first root move scoring beta or more, and the
+        returned scores are only bounds when the best one falls outside the
+        window.
+
+        `scores` may be supplied to collect the results as they are found,
+        which keeps the partial results available when a Timeout is raised.
+        """
+        if scores is None:
+            scores=[]
+        if self.pool is not None and len(root_moves)>1:
+            if self.parallel=="smp":
+                return self.search_root_smp(game, root_moves, depth, scores, alpha, beta)
+            return self.search_root_parallel(game, root_moves, depth, scores, alpha, beta)
+
+        best_score=None
+        principal_variation=[]
+        for m in root_moves:
+            score,line=self.search_root_move(game,m,depth,alpha,beta,best_score is None)
+            if best_score is None or score>best_score:
+                best_score=score
+                principal_variation=line
+            scores.append([score,m])
 
+            if self.method!="minimax":
+                if score>alpha:
+                    alpha=score
+                if score>=beta:
+                    break
+        if self.method=="pvs":
+            self.principal_variation=principal_variation
+        return scores
+
+    def search_root_smp(self, game, root_moves, depth, scores,
+                        alpha=float("-inf"), beta=float("inf")):
+        """Lazy SMP version of search_root(): the worker processes search
+        the same root while this process searches it as usual, and only
+        share their results through the transposition table.
+
+        Half of the helpers search one ply deeper and the others search the
+        root moves in a rotated order, so that they fill the table with
+        entries this process is about to need rather than repeat its work.
+        They are told to stop (by a new table epoch) as soon as this process
+        is done with the iteration.
+        """
+        data=dump_board(game, self)
+        end=timeit.default_timer()+(self.time_left()-self.TIMER_THRESHOLD/2.)/1000.
+        epoch=self.tt.new_epoch()
+        for i in range(self.processes):
+            if i%2==0:
+                helper_moves,helper_depth=root_moves,depth+1
+            else:
+                shift=(i//2+1)%len(root_moves)
+                helper_moves,helper_depth=root_moves[shift:]+root_moves[:shift],depth
+            self.pool.apply_async(_helper_search,
+                                  (data,helper_moves,helper_depth,end,
+                                   self.search_id,self.fresh_tables,epoch))
+
+        #search the root here as usual, without handing it to the pool again
+        pool,self.pool=self.pool,None
+        try:
+            return self.search_root(game, root_moves, depth, scores, alpha, beta)
+        finally:
+            self.pool=pool
+            self.tt.new_epoch()
+
+    def search_root_move(self, game, move, depth, alpha, beta, first):
+        """Search the root move `move` to the given depth with the configured
+        method and return its score and the principal variation starting
+        with it (only for pvs; None otherwise).
+
+        With pvs, the moves after the `first` one are searched with a null
+        window and only searched again with [alpha, beta] when they turn out
+        to be better than alpha.
+        """
+        pvs=self.method=="pvs"
+        child=self.make_move(game,move)
+        if self.method=="minimax":
+            score,_=self.minimax(child,depth,False)
+        elif pvs and not first:
+            #null window: only prove the move is not better than the best one
+            score=-self.negamax(child,depth,-math.nextafter(alpha,math.inf),-alpha,-1,True)[0]
+            if alpha<score<beta:
+                score=-self.negamax(child,depth,-beta,-alpha,-1,True)[0]
+        else:
+            score=-self.negamax(child,depth,-beta,-alpha,-1,pvs)[0]
+        line=None
+        if pvs:
+            line=[move]+list(self.pv_table.get(child.move_count,()))
+        self.unmake_move(game)
+        return score,line
+
+    def search_root_parallel(self, game, root_moves, depth, scores,
+                             alpha=float("-inf"), beta=float("inf")):
+        """Parallel version of search_root() (young brothers wait): the
+        first root move is searched in this process to get a bound, then the
+        other root moves are searched with that bound by the worker pool.
+
+        The workers stop TIMER_THRESHOLD / 2 milliseconds before this process
+        has to give up, so their results are gathered before the threshold;
+        Timeout is raised if some result is still missing by then. Once this
+        process is done with the iteration (it failed high, timed out or got
+        every result), a new `root_epoch` tells the workers to drop the
+        tasks still running or queued.
+        """
+        minimax=self.method=="minimax"
+        first_move=root_moves[0]
+        best_score,principal_variation=self.search_root_move(game,first_move,depth,alpha,beta,True)
+        scores.append([best_score,first_move])
+        if not minimax:
+            alpha=max(alpha,best_score)
+
+        if minimax or best_score<beta:
+            data=dump_board(game, self)
+            end=timeit.default_timer()+(self.time_left()-self.TIMER_THRESHOLD/2.)/1000.
+            epoch=self.root_epoch.value
+            tasks=[(m,self.pool.apply_async(_search_root_move,
+                                            (data,m,depth,alpha,beta,end,
+                                             self.search_id,self.fresh_tables,
+                                             epoch)))
+                   for m in root_moves[1:]]
+            try:
+                for m,task in tasks:
+                    task.wait(max(0.,(self.time_left()-self.TIMER_THRESHOLD)/1000.))
+                    result=task.get() if task.ready() else None
+                    if result is None:
+                        raise Timeout()
+                    score,line,depth_limit_reached=result
+                    self.depth_limit_reached=self.depth_limit_reached or depth_limit_reached
+                    scores.append([score,m])
+                    if score>best_score:
+                        best_score=score
+                        principal_variation=line
+                    if not minimax and score>=beta:
+                        break
+            finally:
+                #the next search must not queue behind the tasks left over
+                self.root_epoch.value=epoch+1
+
+        if self.method=="pvs":
+            self.principal_variation=principal_variation
+        return scores
+
+    def helper_search(self, game, root_moves, depth, end, search_id,
+                      fresh_tables, epoch):
+        """Search the root moves in a worker process for search_root_smp(),
+        until the search is done, the time runs out or the table epoch
+        changes. The results only go to the shared transposition table.
+        """
+        if search_id!=self.search_id:
+            self.search_id=search_id
+            #the shared table is cleared or aged by the main process
+            if self.ordering is not None:
+                if fresh_tables:
+                    self.ordering.clear()
+                else:
+                    self.ordering.age()
+
+        self.start_clock(end,epoch)
+        try:
+            self.search_root(game, root_moves, depth)
+        except Timeout:
+            pass
 
+    def search_subtree(self, game, move, depth, alpha, beta, end, search_id,
+                       fresh_tables, epoch):
+        """Search one root move in a worker process for
+        search_root_parallel() and return (score, line, depth_limit_reached),
+        or None if the search ran out of time or `root_epoch` moved on from
+        `epoch`.
+
+        The transposition table and move ordering tables of the worker are
+        kept across the tasks of the same search (`search_id`), and cleared or
+        aged before the first task of a new one.
+        """
+        #a shared table (e.g. when pondering) is cleared or aged by the main
+        #process
+        tt=None if isinstance(self.tt, SharedTranspositionTable) else self.tt
+        if search_id!=self.search_id:
+            self.search_id=search_id
+            if fresh_tables:
+                if tt is not None:
+                    tt.clear()
+                if self.ordering is not None:
+                    self.ordering.clear()
+            else:
+                if tt is not None:
+                    tt.new_search()
+                if self.ordering is not None:
+                    self.ordering.age()
+
+        self.start_clock(end,epoch)
+        self.depth_limit_reached=False
+        try:
+            score,line=self.search_root_move(game,move,depth,alpha,beta,False)
+        except Timeout:
+            return None
+        return score,line,self.depth_limit_reached
 
     def minimax(self, game, depth, maximizing_player=True):
         """Implement the minimax search algorithm as described in the lectures.
@@ -555,32 +2234,31 @@ class CustomPlayer:
                 to pass the project unit tests; you cannot call any other
                 evaluation function directly.
         """
-        if self.time_left() < self.TIMER_THRESHOLD:
-            raise Timeout()
+        self.nodes+=1
+        if self.nodes>=self.next_poll:
+            self.poll_timer()
             
         #if depth is 0, it is a leaf in the tree, and we just return the score of our player
         #note that I also return the location of the player that made the last move
         #which can be the location of our player or the opponent depending on who has played last
         if (depth == 0):
-            score=self.score(game,self)
-            m=game.get_player_location(game.inactive_player)
-            return score,m
- 
+            self.depth_limit_reached=True
+            return self.score(game,self),game.get_player_location(game.inactive_player)
 
         legal_moves=game.get_legal_moves()      
         
         #if there is no moves possible, return our score and -1,-1 as location   
         if not legal_moves:
             return self.score(game,self),(-1,-1)
-       
-        scores=[]
+
+        #keep the first best move, like best_score_move
+        best_score,best_move=None,legal_moves[0]
         for m in legal_moves:
             #we alternate maximizing and minimizing levels, that's why maximizing is negated
-            child_score,child_move=self.minimax(game.forecast_move(m), depth-1, not maximizing_player)
-            scores.append([child_score,m])
-            
-        #find the best score and corresponding move
-        best_score,best_move=best_score_move(scores,maximizing_player)
+            score,_=self.minimax(self.make_move(game,m), depth-1, not maximizing_player)
+            self.unmake_move(game)
+            if best_score is None or (score>best_score if maximizing_player else score<best_score):
+                best_score,best_move=score,m
 
         return best_score,best_move
 
@@ -588,6 +2266,9 @@ class CustomPlayer:
         """Implement minimax search with alpha-beta pruning as described in the
         lectures.
 
+        The search itself is done by `negamax()`; this method only translates
+        between the maximizing/minimizing view and the negamax view.
+
         Parameters
         ----------
         game : isolation.Board
@@ -622,98 +2303,24 @@ class CustomPlayer:
                 to pass the project unit tests; you cannot call any other
                 evaluation function directly.
         """
-        if self.time_left() < self.TIMER_THRESHOLD:
-            raise Timeout()
-
-        #if depth is 0, it is a leaf in the tree, and we just return the score of our player
-        #note that I also return the location of the player that made the last move
-        #which can be the location of our player or the opponent depending on who has played last
-        if (depth == 0):
-            score=self.score(game,self)
-            m=game.get_player_location(game.inactive_player)
-            return score,m
- 
+        if maximizing_player:
+            return self.negamax(game,depth,alpha,beta,1)
+        score,move=self.negamax(game,depth,-beta,-alpha,-1)
+        return -score,move
 
-        legal_moves=game.get_legal_moves()       
-        
-        #if there is no moves possible, return our score and -1,-1 as location        
-        if not legal_moves:
-            return self.score(game,self),(-1,-1)
-        
-        scores=[]         
-        for m in legal_moves:
-            #we alternate maximizing and minimizing levels, that's why maximizing is negated
-            child_score,child_move=self.alphabeta(game.forecast_move(m), depth-1,alpha,beta, not maximizing_player)
-            scores.append([child_score,m])
-            
-            if maximizing_player:
-                
-                if child_score>alpha:
-                    #we're maximizing, so this is a new lower bound
-                    alpha=child_score
-                if child_score<alpha:
-                    #now that I write a comment here, I wonder if something special
-                    #should happen here...
-                    #unit tests fails if we break
-                    pass                    
-                if child_score==alpha:
-                    #worst move possible, but it happens... Nothing special to do
-                    #units tests fails if we break
-                    pass                
-                
-                if child_score<beta:
-                    #just not the best move possible.
-                    #continue to search to see is there is a better one in this branch
-                    pass
-                if child_score==beta:
-                    #that's the bests possible score, we can stop here
-                    break
-                if child_score>beta:
-                    #now that I write a comment here, I'm not sure why this happens
-                    #and why I should break here.
-                    #probably because the node above is a minimizing node and this is 
-                    #the opponent turn, so we don't really want his score to be so high?
-                    #Yes. That's must be it. Another branch has a lower score for us.
-                    #So the opponent will chose this other branch, not this one.
-                    #So no need to continue searching.
-                    break
-                                     
+    def pvs(self, game, depth, alpha=float("-inf"), beta=float("inf"), maximizing_player=True):
+        """Implement principal variation search (NegaScout): the first move
+        is searched with the full [alpha, beta] window, the other moves with a
+        null window that can only tell whether they are better than the best
+        move so far. A move that turns out to be better is searched again
+        with the full window.
 
-                
-            #if minimizing level
-            if not maximizing_player:
-                
-                if child_score<beta:
-                    #we're minimizing, so this is a new upper bound
-                    beta=child_score
-                if child_score>beta:
-                    #now that I write a comment here, I'm not sure why this happens
-                    #and maybe something special should happen here...
-                    ###! unit tests doesnt fail if we break
-                    pass
-                if child_score==beta:
-                    #just not a good move from our player point of view
-                    #unit tests fails if we break
-                    pass
-                
-                if child_score==alpha:
-                    #ok, that's a bad score, no need to search the other branches, even if
-                    #another have a better score, this is the one the opponent will chose
-                    break
-                if child_score>alpha:
-                    #just not the worst move, lets see the other nodes...
-                    pass
-                if child_score<alpha:
-                    #this move is so bad, that it's even lower than another branch we already search
-                    break
-                    
-        best_score,best_move=best_score_move(scores,maximizing_player)     
-        return best_score,best_move
-    
+        Scores are floats, so the null window is [alpha, next float above
+        alpha] rather than a zero-width window: a score equal to the bound
+        must not be read as both a fail high and a fail low.
 
-    def alphabeta_with_ordering(self, game,initial_depth,depth,ordering_depth,best_scores_dict,parent_moves,alpha=float("-inf"), beta=float("inf"), maximizing_player=True):
-        """Implement minimax search with alpha-beta pruning as described in the
-        lectures.
+        The best line found from this node is left in
+        `self.pv_table[game.move_count]`.
 
         Parameters
         ----------
@@ -742,150 +2349,394 @@ class CustomPlayer:
 
         tuple(int, int)
             The best move for the current branch; (-1, -1) for no legal moves
+        """
+        if maximizing_player:
+            return self.negamax(game,depth,alpha,beta,1,True)
+        score,move=self.negamax(game,depth,-beta,-alpha,-1,True)
+        return -score,move
 
-        Notes
-        -----
-            (1) You MUST use the `self.score()` method for board evaluation
-                to pass the project unit tests; you cannot call any other
-                evaluation function directly.
+    def negamax(self, game, depth, alpha=float("-inf"), beta=float("inf"), color=1, pvs=False):
+        """Alpha-beta search core in negamax form, shared by alphabeta() and
+        pvs(): every node maximizes the score from the point of view of the
+        player to move, which is `color` times the score of `self.score()`.
+
+        The best score and move are kept in local variables, so nothing is
+        allocated per child (apart from the move ordering and principal
+        variation bookkeeping when those are enabled).
+
+        Parameters
+        ----------
+        game : isolation.Board
+            An instance of the Isolation game `Board` class representing the
+            current game state
+
+        depth : int
+            Depth is an integer representing the maximum number of plies to
+            search in the game tree before aborting
+
+        alpha : float
+            Lower bound of the search window, in the negamax view
+
+        beta : float
+            Upper bound of the search window, in the negamax view
+
+        color : int
+            1 if the node is a maximizing layer for `self`, -1 otherwise
+
+        pvs : bool
+            Flag indicating whether to search the moves after the first with
+            a null window (principal variation search) and collect the
+            principal variation in `self.pv_table`
+
+        Returns
+        -------
+        float
+            The score for the current search branch, in the negamax view
+            (fail-soft: a bound when outside of the [alpha, beta] window)
+
+        tuple(int, int)
+            The best move for the current branch; (-1, -1) for no legal moves
         """
-        if self.time_left() < self.TIMER_THRESHOLD:
-            raise Timeout()
+        self.nodes+=1
+        if self.nodes>=self.next_poll:
+            self.poll_timer()
+
+        if pvs:
+            ply=game.move_count
+            self.pv_table[ply]=()
+
+        #once the players are separated, the game is decided by the longest
+        #walk of each of them in its own region, which is solved exactly
+        #(only above the leaves, where it pays for itself)
+        if self.endgame is not None and depth>0:
+            score=self.endgame.solve(game)
+            if score is not None:
+                if game.active_player!=self:
+                    score=-score
+                return color*score,game.get_player_location(game.inactive_player)
 
         #if depth is 0, it is a leaf in the tree, and we just return the score of our player
         #note that I also return the location of the player that made the last move
         #which can be the location of our player or the opponent depending on who has played last
-        if (depth == 0):
-            score=self.score(game,self)
-            m=game.get_player_location(game.inactive_player)
-            return score,m
- 
-        pass
-    
-        #if we've already explores this depth and move in a previous iteration of
-        #iterative search, we'll use the list of moves we have recorded
-        #this list of moves is ordered by the previously evaluated scores
-        #which should allow more 'alphabeta' pruning
-        #it also avoids a call to get_legal_moves
-        if (initial_depth - depth)<=ordering_depth:
-            if( parent_moves in best_scores_dict ):
-                legal_moves=[]
-                for score,move in best_scores_dict[parent_moves]:
-                    legal_moves.append(move)
-                if initial_depth==3 and depth==2:
-                    pass
-                    #print("YO")
-                    
-            else:
-                legal_moves=game.get_legal_moves() 
-                if initial_depth==3 and depth==2:
-                    pass
-                    #print("YA")
-        else:
-            legal_moves=game.get_legal_moves()
-            if initial_depth==3 and depth==2:
-                pass
-                #print("YU")
-        
-        #if there is no moves possible, return our score and -1,-1 as location        
+        if depth==0:
+            self.depth_limit_reached=True
+            return color*self.score(game,self),game.get_player_location(game.inactive_player)
+
+        legal_moves=game.get_legal_moves()
+
+        #if there is no moves possible, return our score and -1,-1 as location
         if not legal_moves:
-            return self.score(game,self),(-1,-1)
-        
-        scores=[]
-         
+            return color*self.score(game,self),(-1,-1)
+
+        #look the position up in the transposition table: a deep enough entry
+        #can answer for the whole subtree or at least tighten the window,
+        #and its best move is tried first
+        entry_move=None
+        tt=self.tt
+        if tt is not None:
+            entry_score,entry_move,alpha,beta=self.probe_table(game,depth,alpha,beta,color)
+            if entry_score is not None:
+                if pvs and entry_move is not None:
+                    self.pv_table[ply]=(entry_move,)
+                return entry_score,entry_move
+            alpha_searched,beta_searched=alpha,beta
+
+        ordering=self.ordering
+        if ordering is not None:
+            legal_moves=ordering.order(game,legal_moves,entry_move)
+        elif entry_move in legal_moves:
+            legal_moves.remove(entry_move)
+            legal_moves.insert(0,entry_move)
+
+        best_score,best_move=-math.inf,legal_moves[0]
+        first=True
         for m in legal_moves:
-            #we alternate maximizing and minimizing levels, that's why maximizing is negated
-            child_score,child_move=self.alphabeta_with_ordering(game.forecast_move(m),initial_depth,depth-1,ordering_depth,best_scores_dict,parent_moves+'-'+str(m),alpha,beta, not maximizing_player)
-
-            
-            #add score to scores already sorted
-            i=0
-            x=0
-            if maximizing_player:
-                for f_score,f_m in scores:
-                    if child_score>=f_score:
-                        x=i
-                        break
-                    else:
-                        x=i+1
-                    i=i+1
+            child=self.make_move(game,m)
+            if pvs and not first:
+                #null window: only prove the move is not better than the best one
+                score=-self.negamax(child,depth-1,-math.nextafter(alpha,math.inf),-alpha,-color,True)[0]
+                if alpha<score<beta:
+                    score=-self.negamax(child,depth-1,-beta,-alpha,-color,True)[0]
             else:
-                for f_score,f_m in scores:
-                    if child_score<=f_score:
-                        x=i
-                        break
-                    else:
-                        x=i+1
-                    i=i+1
-            
-            scores.insert(x,[child_score,m])
-            pass
+                score=-self.negamax(child,depth-1,-beta,-alpha,-color,pvs)[0]
+            self.unmake_move(game)
+            first=False
+
+            if score>best_score:
+                best_score,best_move=score,m
+                if pvs:
+                    self.pv_table[ply]=(m,)+self.pv_table.get(ply+1,())
+                if score>alpha:
+                    alpha=score
+
+            if score>=beta:
+                #remember the moves that refute the line, they are tried early
+                #in the sibling nodes and in the next iterations
+                if ordering is not None:
+                    ordering.record_cutoff(game,m,depth)
+                break
+
+        if tt is not None:
+            self.store_table(game,depth,best_score,best_move,alpha_searched,beta_searched,color)
 
-            #scores.append([child_score,m])
-            
-            if maximizing_player:
-                
-                if child_score<beta:
-                    #just not the best move possible.
-                    #continue to search to see is there is a better one in this branch
-                    pass
-                if child_score==beta:
-                    #that's the bests possible score, we can stop here
-                    break
-                if child_score>beta:
-                    #now that I write a comment here, I'm not sure why this happens
-                    #and why I should break here.
-                    #probably because the node above is a minimizing node and this is 
-                    #the opponent turn, so we don't really want his score to be so high?
-                    #Yes. That's must be it. Another branch has a lower score for us.
-                    #So the opponent will chose this other branch, not this one.
-                    #So no need to continue searching.
-                    break
-                                     
-                if child_score>alpha:
-                    #we're maximizing, so this is a new lower bound
-                    alpha=child_score
-                if child_score<alpha:
-                    #now that I write a comment here, I wonder if something special
-                    #should happen here...
-                    #unit tests fails if we break
-                    pass                    
-                if child_score==alpha:
-                    #worst move possible, but it happens... Nothing special to do
-                    #units tests fails if we break
-                    pass
-                
-            #if minimizing level
-            if not maximizing_player:
-                
-                if child_score<beta:
-                    #we're minimizing, so this is a new upper bound
-                    beta=child_score
-                if child_score>beta:
-                    #now that I write a comment here, I'm not sure why this happens
-                    #and maybe something special should happen here...
-                    ###! unit tests doesnt fail if we break
-                    pass
-                if child_score==beta:
-                    #just not a good move from our player point of view
-                    #unit tests fails if we break
-                    pass
-                
-                if child_score==alpha:
-                    #ok, that's a bad score, no need to search the other branches, even if
-                    #another have a better score, this is the one the opponent will chose
-                    break
-                if child_score>alpha:
-                    #just not the worst move, lets see the other nodes...
-                    pass
-                if child_score<alpha:
-                    #this move is so bad, that it's even lower than another branch we already search
+        return best_score,best_move
+
+    def probe_table(self, game, depth, alpha, beta, color=1):
+        """Look the position up in the transposition table.
+
+        The table holds scores from the point of view of `self` (as returned
+        by alphabeta()); `alpha`, `beta` and the returned score are in the
+        negamax view of `color`.
+
+        Returns
+        -------
+        (float, (int, int), float, float)
+            The stored score if the entry answers for the node at this depth
+            and window (None otherwise), the stored best move (None if there
+            is no entry), and the alpha/beta window narrowed by the entry.
+        """
+        entry=self.tt.probe(game.hash_key)
+        if entry is None:
+            return None,None,alpha,beta
+
+        _,entry_depth,entry_score,entry_bound,entry_move,_=entry
+        if entry_depth>=depth:
+            #the entry may come from a search that was cut by the depth limit
+            if entry_score!=float("inf") and entry_score!=float("-inf"):
+                self.depth_limit_reached=True
+            if color<0:
+                entry_score=-entry_score
+                if entry_bound!=EXACT:
+                    entry_bound=UPPER_BOUND if entry_bound==LOWER_BOUND else LOWER_BOUND
+            if entry_bound==EXACT:
+                return entry_score,entry_move,alpha,beta
+            if entry_bound==LOWER_BOUND and entry_score>alpha:
+                alpha=entry_score
+            elif entry_bound==UPPER_BOUND and entry_score<beta:
+                beta=entry_score
+            if alpha>=beta:
+                return entry_score,entry_move,alpha,beta
+        return None,entry_move,alpha,beta
+
+    def store_table(self, game, depth, score, move, alpha, beta, color=1):
+        """Store the result of searching the position with window
+        [alpha, beta] (in the negamax view of `color`) in the transposition
+        table."""
+        if score<=alpha:
+            bound=UPPER_BOUND
+        elif score>=beta:
+            bound=LOWER_BOUND
+        else:
+            bound=EXACT
+        if color<0:
+            score=-score
+            if bound!=EXACT:
+                bound=UPPER_BOUND if bound==LOWER_BOUND else LOWER_BOUND
+        self.tt.store(game.hash_key,depth,score,bound,move)
+
+
+class MCTSPlayer:
+    """Game-playing agent that chooses a move with Monte Carlo tree search:
+    UCT selection down the tree, one new level of nodes per visited leaf and
+    uniformly random playouts to the end of the game.
+
+    The tree is stored in flat lists indexed by node (the children of a node
+    are consecutive), the playouts are played with push_move()/pop_move() on
+    a single `isolation.BitBoard`, and the subtree of the position reached
+    after the opponent's reply is kept for the next move.
+
+    Parameters
+    ----------
+    exploration : float (optional)
+        The UCT exploration constant.
+
+    timeout : float (optional)
+        Time remaining (in milliseconds) when search is aborted. Should be a
+        positive value large enough to allow the function to return before the
+        timer expires.
+
+    seed : int (optional)
+        Seed of the random generator used by the playouts.
+    """
+
+    def __init__(self, exploration=math.sqrt(2), timeout=10., seed=None):
+        self.exploration = exploration
+        self.TIMER_THRESHOLD = timeout
+        self.rng = random.Random(seed)
+        # number of playouts run by the last get_move() call
+        self.playouts = 0
+        # game (size and players), move_count and move returned by the last
+        # get_move() call, used to find the root of the next search
+        self.last_game = None
+        self.last_move_count = None
+        self.last_move = None
+        self.new_tree()
+
+    def new_tree(self):
+        """Start a tree holding only the root node."""
+        # for each node: the move leading to it, the index of its first child
+        # (-1 until expanded), its number of children, its number of visits
+        # and the number of playouts won by the player who made its move
+        self.moves = [None]
+        self.first_child = [-1]
+        self.num_children = [0]
+        self.visits = [0]
+        self.wins = [0]
+
+    def reroot(self, root):
+        """Keep only the subtree of `root`, which becomes node 0."""
+        nodes = [root]
+        first_child = []
+        i = 0
+        while i < len(nodes):
+            first = self.first_child[nodes[i]]
+            if first < 0:
+                first_child.append(-1)
+            else:
+                first_child.append(len(nodes))
+                nodes.extend(range(first, first + self.num_children[nodes[i]]))
+            i += 1
+        self.moves = [self.moves[n] for n in nodes]
+        self.first_child = first_child
+        self.num_children = [self.num_children[n] for n in nodes]
+        self.visits = [self.visits[n] for n in nodes]
+        self.wins = [self.wins[n] for n in nodes]
+
+    def find_child(self, node, move):
+        """Return the child of `node` reached with `move`, or None."""
+        first = self.first_child[node]
+        if first < 0:
+            return None
+        for child in range(first, first + self.num_children[node]):
+            if self.moves[child] == move:
+                return child
+        return None
+
+    def reuse_tree(self, game):
+        """Make node 0 the root for `game`: keep the subtree reached with the
+        last move and the opponent's reply when `game` follows the previous
+        search, or start a new tree otherwise."""
+        this_game = (game.width, game.height, game.__player_1__, game.__player_2__)
+        root = None
+        if this_game == self.last_game and \
+           game.move_count == self.last_move_count + 2 and \
+           game.get_player_location(game.active_player) == self.last_move:
+            child = self.find_child(0, self.last_move)
+            if child is not None:
+                reply = game.get_player_location(game.inactive_player)
+                root = self.find_child(child, reply)
+        if root is None:
+            self.new_tree()
+        else:
+            self.reroot(root)
+        self.last_game = this_game
+        self.last_move_count = game.move_count
+
+    def expand(self, node, board):
+        """Add the children of `node` for the legal moves on `board`."""
+        legal_moves = board.get_legal_moves()
+        self.first_child[node] = len(self.moves)
+        self.num_children[node] = len(legal_moves)
+        self.moves.extend(legal_moves)
+        self.first_child.extend([-1] * len(legal_moves))
+        self.num_children.extend([0] * len(legal_moves))
+        self.visits.extend([0] * len(legal_moves))
+        self.wins.extend([0] * len(legal_moves))
+
+    def select(self, node):
+        """Return the child of `node` with the highest UCT value (the first
+        unvisited child if there is one)."""
+        first = self.first_child[node]
+        visits = self.visits
+        wins = self.wins
+        scale = self.exploration * math.sqrt(math.log(visits[node] or 1))
+        best_child, best_value = first, -1.
+        for child in range(first, first + self.num_children[node]):
+            n = visits[child]
+            if n == 0:
+                return child
+            value = wins[child] / n + scale / math.sqrt(n)
+            if value > best_value:
+                best_child, best_value = child, value
+        return best_child
+
+    def run_playout(self, board):
+        """Run one iteration of the search from the root position on
+        `board`, which is left unchanged."""
+        node = 0
+        path = [0]
+        while True:
+            if self.first_child[node] < 0:
+                #leaves are expanded on their second visit
+                if node != 0 and self.visits[node] == 0:
                     break
-                    
-        #best_score,best_move=best_score_move(scores,maximizing_player)
-        #scores is sorted now. The first element is the best.
-        best_score,best_move=scores[0]
-        if (initial_depth - depth)<=ordering_depth:
-            best_scores_dict[parent_moves]=scores
-        
-        return best_score,best_move
\ No newline at end of file
+                self.expand(node, board)
+            if not self.num_children[node]:
+                break
+            node = self.select(node)
+            board.push_move(self.moves[node])
+            path.append(node)
+
+        pushed = len(path) - 1
+        choice = self.rng.choice
+        legal_moves = board.get_legal_moves()
+        while legal_moves:
+            board.push_move(choice(legal_moves))
+            pushed += 1
+            legal_moves = board.get_legal_moves()
+        #the player to move at the end of the game lost; the root player made
+        #the moves into the nodes at odd depths
+        root_player_won = (pushed & 1) == 1
+        for _ in range(pushed):
+            board.pop_move()
+
+        for depth, node in enumerate(path):
+            self.visits[node] += 1
+            if (depth % 2 == 1) == root_player_won:
+                self.wins[node] += 1
+
+    def get_move(self, game, legal_moves, time_left):
+        """Search for the best move from the available legal moves and return a
+        result before the time limit expires.
+
+        Parameters
+        ----------
+        game : `isolation.Board`
+            An instance of `isolation.Board` encoding the current state of the
+            game (e.g., player locations and blocked cells).
+
+        legal_moves : list<(int, int)>
+            A list containing legal moves. Moves are encoded as tuples of pairs
+            of ints defining the next (row, col) for the agent to occupy.
+
+        time_left : callable
+            A function that returns the number of milliseconds left in the
+            current turn. Returning with any less than 0 ms remaining forfeits
+            the game.
+
+        Returns
+        -------
+        (int, int)
+            Board coordinates corresponding to the most visited move; may
+            return (-1, -1) if there are no available legal moves.
+        """
+        self.playouts = 0
+        if not legal_moves:
+            return (-1, -1)
+        if len(legal_moves) == 1:
+            self.last_move = legal_moves[0]
+            return legal_moves[0]
+
+        self.reuse_tree(game)
+        board = BitBoard.from_board(game)
+        while time_left() > self.TIMER_THRESHOLD:
+            self.run_playout(board)
+            self.playouts += 1
+
+        move = legal_moves[0]
+        first = self.first_child[0]
+        if first >= 0:
+            children = range(first, first + self.num_children[0])
+            move = self.moves[max(children, key=lambda child: self.visits[child])]
+        self.last_move = move
+        return move
@@ -0,0 +1,116 @@
+"""
+Generate the pattern table read by `game_agent.pattern_score()`.
+
+The table gives a value to every knight neighborhood pattern (see
+`game_agent.knight_pattern()`): games are played on a `BitBoard` by a noisy
+greedy policy, the pattern of both players is recorded at every position,
+and the value of a pattern is the log-odds that the player whose
+neighborhood it describes goes on to win the game, smoothed with one win
+and one loss:
+
+    score = log((wins + 1) / (losses + 1))
+
+The table is written as JSON next to `game_agent.py` (or to the path given
+with --output) and is loaded when `game_agent` is imported:
+
+    python generate_pattern_table.py --games 50000 [--ring2]
+
+Purely random games are not used: their outcome hardly depends on the
+position many moves before the end, so every pattern came out close to
+even odds.
+"""
+
+import argparse
+import json
+import math
+import random
+
+from isolation import BitBoard
+from game_agent import PATTERN_TABLE_FILE
+from game_agent import knight_pattern
+
+NUM_GAMES = 50000  # number of games played
+EPSILON = 0.2  # probability of playing a random move instead of a greedy one
+SEED = 0
+
+
+def choose_move(board, legal_moves, rng):
+    """
+    Return a random move with probability EPSILON, otherwise the move that
+    maximizes the difference in legal moves between the player and its
+    opponent (ties broken at random).
+    """
+    if rng.random() < EPSILON:
+        return rng.choice(legal_moves)
+    player = board.active_player
+    best_move, best_score = None, None
+    for move in legal_moves:
+        new_board = board.forecast_move(move)
+        score = len(new_board.get_legal_moves(player)) - \
+            len(new_board.get_legal_moves()) + rng.random()
+        if best_score is None or score > best_score:
+            best_move, best_score = move, score
+    return best_move
+
+
+def play_game(rng, ring2, width=7, height=7):
+    """
+    Play a game from random opening moves and return the winner together
+    with the list of (player, pattern) pairs of every later position.
+    """
+    players = ("Player1", "Player2")
+    board = BitBoard(players[0], players[1], width, height)
+    patterns = []
+    while True:
+        legal_moves = board.get_legal_moves()
+        if not legal_moves:
+            return board.inactive_player, patterns
+        if board.move_count < 2:
+            board.apply_move(rng.choice(legal_moves))
+            continue
+        for player in players:
+            patterns.append((player, knight_pattern(board, player, ring2)))
+        board.apply_move(choose_move(board, legal_moves, rng))
+
+
+def generate(num_games, ring2, seed=SEED):
+    """
+    Return the pattern table (as stored in the JSON file) estimated from
+    `num_games` games.
+    """
+    rng = random.Random(seed)
+    size = 1 << (12 if ring2 else 8)
+    wins = [0] * size
+    losses = [0] * size
+    for _ in range(num_games):
+        winner, patterns = play_game(rng, ring2)
+        for player, pattern in patterns:
+            if player == winner:
+                wins[pattern] += 1
+            else:
+                losses[pattern] += 1
+
+    scores = [round(math.log((w + 1.) / (l + 1.)), 4)
+              for w, l in zip(wins, losses)]
+    return {"ring2": ring2, "games": num_games, "scores": scores}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--games", type=int, default=NUM_GAMES,
+                        help="number of games to play")
+    parser.add_argument("--ring2", action="store_true",
+                        help="also encode the number of cells two moves away")
+    parser.add_argument("--output", default=PATTERN_TABLE_FILE,
+                        help="path of the JSON table")
+    args = parser.parse_args()
+
+    table = generate(args.games, args.ring2)
+    with open(args.output, "w") as f:
+        json.dump(table, f)
+    print("Wrote {} patterns from {} games to {}".format(
+        len(table["scores"]), args.games, args.output))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+This file contains the `BatchBoard` class, which plays many games of
+isolation at once with NumPy arrays so that random playouts can be run in
+batches (e.g., for Monte Carlo tree search or evaluation by rollout).
+
+It requires NumPy, which the rest of the package does not, so it is not
+imported by `isolation/__init__.py`:
+
+    from isolation.batch_board import BatchBoard
+"""
+
+import numpy as np
+
+from .isolation import Board
+from .tables import DIRECTIONS
+
+
+DIRECTION_ROWS = np.array([dr for dr, _ in DIRECTIONS])
+DIRECTION_COLS = np.array([dc for _, dc in DIRECTIONS])
+
+
+class BatchBoard(object):
+    """
+    A batch of K isolation games stored as arrays, following the rules of
+    `isolation.Board.__get_moves__`: each player moves like a knight to an
+    open cell, and a player who has not moved yet may move to any open cell.
+
+    Players are identified by their slot: 0 for player 1 and 1 for player 2.
+
+    Parameters
+    ----------
+    k : int
+        The number of games in the batch.
+
+    width : int (optional)
+        The number of columns of each board.
+
+    height : int (optional)
+        The number of rows of each board.
+
+    Attributes
+    ----------
+    blocked : numpy.ndarray<bool> of shape (K, height, width)
+        The cells blocked in each game.
+
+    rows, cols : numpy.ndarray<int> of shape (K, 2)
+        The location of each player in each game (-1 until the player moves).
+
+    active : numpy.ndarray<int> of shape (K,)
+        The slot of the player holding the initiative in each game.
+
+    move_count : numpy.ndarray<int> of shape (K,)
+        The number of moves applied in each game.
+
+    winner : numpy.ndarray<int> of shape (K,)
+        The slot of the winner of each game, or -1 while it is not over.
+    """
+
+    def __init__(self, k, width=7, height=7):
+        self.k = k
+        self.width = width
+        self.height = height
+        self.blocked = np.zeros((k, height, width), dtype=bool)
+        self.rows = np.full((k, 2), -1, dtype=np.int64)
+        self.cols = np.full((k, 2), -1, dtype=np.int64)
+        self.active = np.zeros(k, dtype=np.int64)
+        self.move_count = np.zeros(k, dtype=np.int64)
+        self.winner = np.full(k, -1, dtype=np.int64)
+
+    @classmethod
+    def from_board(cls, board, k):
+        """
+        Build a batch of K copies of the game state of an `isolation.Board`
+        (or `isolation.BitBoard`).
+
+        Parameters
+        ----------
+        board : `isolation.Board`
+            The game state to copy.
+
+        k : int
+            The number of games in the batch.
+
+        Returns
+        ----------
+        `isolation.batch_board.BatchBoard`
+        """
+        batch = cls(k, board.width, board.height)
+        batch.blocked[:] = True
+        for r, c in board.get_blank_spaces():
+            batch.blocked[:, r, c] = False
+        for slot, player in enumerate((board.__player_1__, board.__player_2__)):
+            move = board.get_player_location(player)
+            if move != Board.NOT_MOVED:
+                batch.rows[:, slot], batch.cols[:, slot] = move
+        batch.active[:] = 0 if board.active_player == board.__player_1__ else 1
+        batch.move_count[:] = board.move_count
+        return batch
+
+    def legal_moves_mask(self):
+        """
+        Return the legal knight moves of the active player of each game.
+
+        Returns
+        ----------
+        numpy.ndarray<bool> of shape (K, 8)
+            For each game, whether the active player can move in each of the
+            `DIRECTIONS` (all False for a player who has not moved yet).
+        """
+        games = np.arange(self.k)
+        rows = self.rows[games, self.active][:, None] + DIRECTION_ROWS
+        cols = self.cols[games, self.active][:, None] + DIRECTION_COLS
+        inside = (rows >= 0) & (rows < self.height) & \
+                 (cols >= 0) & (cols < self.width) & \
+                 (self.rows[games, self.active] >= 0)[:, None]
+        open_cells = ~self.blocked[games[:, None],
+                                   np.clip(rows, 0, self.height - 1),
+                                   np.clip(cols, 0, self.width - 1)]
+        return inside & open_cells
+
+    def step(self, rng):
+        """
+        Apply one uniformly random legal move in every game that is not over,
+        and record the winner of the games whose active player has no legal
+        move left.
+
+        Parameters
+        ----------
+        rng : numpy.random.Generator
+            The random generator used to pick the moves.
+
+        Returns
+        ----------
+        bool
+            True while some game is not over.
+        """
+        games = np.arange(self.k)
+        live = self.winner < 0
+        active = self.active
+        placed = self.rows[games, active] >= 0
+
+        legal = self.legal_moves_mask()
+        no_move = np.where(placed, ~legal.any(axis=1),
+                           self.blocked.reshape(self.k, -1).all(axis=1))
+        stuck = live & no_move
+        self.winner[stuck] = 1 - active[stuck]
+        live &= ~stuck
+
+        # knight moves: pick the legal direction with the largest random key
+        movers = np.flatnonzero(live & placed)
+        if movers.size:
+            keys = np.where(legal[movers], rng.random((movers.size, 8)), -1.)
+            direction = keys.argmax(axis=1)
+            slot = active[movers]
+            self.rows[movers, slot] += DIRECTION_ROWS[direction]
+            self.cols[movers, slot] += DIRECTION_COLS[direction]
+
+        # first moves: pick the open cell with the largest random key
+        openers = np.flatnonzero(live & ~placed)
+        if openers.size:
+            cells = self.height * self.width
+            keys = np.where(self.blocked[openers].reshape(-1, cells), -1.,
+                            rng.random((openers.size, cells)))
+            cell = keys.argmax(axis=1)
+            slot = active[openers]
+            self.rows[openers, slot] = cell // self.width
+            self.cols[openers, slot] = cell % self.width
+
+        moved = np.flatnonzero(live)
+        slot = active[moved]
+        self.blocked[moved, self.rows[moved, slot], self.cols[moved, slot]] = True
+        self.active[moved] ^= 1
+        self.move_count[moved] += 1
+        return bool(live.any())
+
+    def playout(self, rng):
+        """
+        Play random moves in every game until all of them are over.
+
+        Parameters
+        ----------
+        rng : numpy.random.Generator
+            The random generator used to pick the moves.
+
+        Returns
+        ----------
+        numpy.ndarray<int> of shape (K,)
+            The slot of the winner of each game.
+        """
+        while self.step(rng):
+            pass
+        return self.winner
@@ -0,0 +1,329 @@
+"""
+This file contains the `BitBoard` class, an alternative backend for the
+isolation `Board` that encodes the blocked cells as the bits of a single
+Python int instead of a list of lists.
+
+Cells are numbered in column-major order (index = col * height + row) so that
+iterating over the bits in increasing order visits the cells in the same order
+as `Board.get_blank_spaces()`. The knight destinations of every cell are read
+from the `isolation.tables` shared by every board of that size, which turns
+move generation into a handful of bitwise tests.
+"""
+
+from .isolation import Board
+from .isolation import zobrist_keys
+from .tables import board_tables
+
+
+class BitBoard(Board):
+    """
+    Drop-in replacement for `isolation.Board` that stores the blocked cells
+    as an int bitmask and each player location as a cell index.
+
+    Parameters
+    ----------
+    player_1 : object
+        An object with a get_move() function. This is the only function
+        directly called by the Board class for each player.
+
+    player_2 : object
+        An object with a get_move() function. This is the only function
+        directly called by the Board class for each player.
+
+    width : int (optional)
+        The number of columns that the board should have.
+
+    height : int (optional)
+        The number of rows that the board should have.
+    """
+
+    def __init__(self, player_1, player_2, width=7, height=7):
+        self.width = width
+        self.height = height
+        self.move_count = 0
+        self.__player_1__ = player_1
+        self.__player_2__ = player_2
+        self.__active_player__ = player_1
+        self.__inactive_player__ = player_2
+        self.__tables__ = board_tables(width, height)
+        self._occupied = 0
+        self._active_cell = None
+        self._inactive_cell = None
+        self.__undo_stack__ = []
+        self.__hash_key__ = None
+        self.__components__ = None
+
+    @classmethod
+    def from_board(cls, board):
+        """
+        Build a `BitBoard` encoding the same game state as a list based
+        `isolation.Board`.
+
+        Parameters
+        ----------
+        board : `isolation.Board`
+            The board to convert.
+
+        Returns
+        ----------
+        `isolation.BitBoard`
+            A new board with the same players, blocked cells, player
+            locations, initiative and move count.
+        """
+        if isinstance(board, BitBoard):
+            return board.copy()
+
+        new_board = cls(board.__player_1__, board.__player_2__,
+                        width=board.width, height=board.height)
+        new_board.move_count = board.move_count
+        new_board.__active_player__ = board.active_player
+        new_board.__inactive_player__ = board.inactive_player
+        for r, c in board.get_blank_spaces():
+            new_board._occupied |= 1 << (c * board.height + r)
+        new_board._occupied ^= new_board.__tables__.full_mask
+        for player, attr in ((board.active_player, "_active_cell"),
+                             (board.inactive_player, "_inactive_cell")):
+            move = board.get_player_location(player)
+            if move != Board.NOT_MOVED:
+                setattr(new_board, attr, move[1] * board.height + move[0])
+        return new_board
+
+    def copy(self):
+        """ Return a copy of the current board. """
+        new_board = self.__class__.__new__(self.__class__)
+        new_board.__dict__.update(self.__dict__)
+        new_board.__undo_stack__ = []
+        return new_board
+
+    def move_is_legal(self, move):
+        """
+        Test whether a move is legal in the current game state.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+
+        Returns
+        ----------
+        bool
+            Returns True if the move is legal, False otherwise
+        """
+        row, col = move
+        return 0 <= row < self.height and \
+               0 <= col < self.width and \
+               not self._occupied >> (col * self.height + row) & 1
+
+    def get_blank_spaces(self):
+        """
+        Return a list of the locations that are still available on the board.
+        """
+        occupied = self._occupied
+        return [cell for idx, cell in enumerate(self.__tables__.cells)
+                if not occupied >> idx & 1]
+
+    def blank_mask(self):
+        """
+        Return the locations that are still available on the board as a
+        bitmask of cell indices (index = col * height + row).
+        """
+        return self.__tables__.full_mask & ~self._occupied
+
+    def get_player_location(self, player):
+        """
+        Find the current location of the specified player on the board.
+
+        Parameters
+        ----------
+        player : object
+            An object registered as a player in the current game.
+
+        Returns
+        ----------
+        (int, int)
+            The coordinate pair (row, column) of the input player.
+        """
+        idx = self._cell_of(player)
+        if idx is None:
+            return Board.NOT_MOVED
+        return self.__tables__.cells[idx]
+
+    def get_legal_moves(self, player=None):
+        """
+        Return the list of all legal moves for the specified player.
+
+        Parameters
+        ----------
+        player : object (optional)
+            An object registered as a player in the current game. If None,
+            return the legal moves for the active player on the board.
+
+        Returns
+        ----------
+        list<(int, int)>
+            The list of coordinate pairs (row, column) of all legal moves
+            for the player constrained by the current game state.
+        """
+        if player is None:
+            idx = self._active_cell
+        else:
+            idx = self._cell_of(player)
+        if idx is None:
+            return self.get_blank_spaces()
+        occupied = self._occupied
+        return [move for bit, move in self.__tables__.moves[idx] if not occupied & bit]
+
+    def legal_moves_mask(self, player=None):
+        """
+        Return the bitmask of the cells the specified player (by default the
+        active player) can move to.
+        """
+        if player is None:
+            idx = self._active_cell
+        else:
+            idx = self._cell_of(player)
+        if idx is None:
+            return self.__tables__.full_mask & ~self._occupied
+        return self.__tables__.masks[idx] & ~self._occupied
+
+    def apply_move(self, move):
+        """
+        Move the active player to a specified location.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+
+        Returns
+        ----------
+        None
+        """
+        row, col = move
+        idx = col * self.height + row
+        if self.__hash_key__ is not None:
+            keys = zobrist_keys(self.width, self.height)
+            locations = keys.locations[self.move_count & 1]
+            key = self.__hash_key__ ^ keys.side ^ keys.cells[idx] ^ locations[idx]
+            if self._active_cell is not None:
+                key ^= locations[self._active_cell]
+            self.__hash_key__ = key
+        if self.__components__ is not None:
+            self.__block_cell__(idx)
+        self._occupied |= 1 << idx
+        self._active_cell, self._inactive_cell = self._inactive_cell, idx
+        self.__active_player__, self.__inactive_player__ = self.__inactive_player__, self.__active_player__
+        self.move_count += 1
+
+    def push_move(self, move):
+        """
+        Apply a move in place and remember how to take it back with
+        `pop_move()`.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+
+        Returns
+        ----------
+        None
+        """
+        self.__undo_stack__.append((self._active_cell, self.__hash_key__,
+                                    self.__components__))
+        self.apply_move(move)
+
+    def pop_move(self):
+        """
+        Undo the last move applied with `push_move()`.
+
+        Returns
+        ----------
+        (int, int)
+            The move that was taken back.
+        """
+        idx = self._inactive_cell
+        self._occupied &= ~(1 << idx)
+        previous_cell, self.__hash_key__, self.__components__ = self.__undo_stack__.pop()
+        self._active_cell, self._inactive_cell = previous_cell, self._active_cell
+        self.__active_player__, self.__inactive_player__ = self.__inactive_player__, self.__active_player__
+        self.move_count -= 1
+        return self.__tables__.cells[idx]
+
+    def __compute_hash_key__(self):
+        """ Compute the Zobrist key of the current game state from scratch. """
+        keys = zobrist_keys(self.width, self.height)
+        key = keys.side if self.move_count & 1 else 0
+        occupied = self._occupied
+        idx = 0
+        while occupied:
+            if occupied & 1:
+                key ^= keys.cells[idx]
+            occupied >>= 1
+            idx += 1
+        for slot, player in enumerate((self.__player_1__, self.__player_2__)):
+            cell = self._cell_of(player)
+            if cell is not None:
+                key ^= keys.locations[slot][cell]
+        return key
+
+    def is_winner(self, player):
+        """ Test whether the specified player has won the game. """
+        return player == self.__inactive_player__ and not self.legal_moves_mask()
+
+    def is_loser(self, player):
+        """ Test whether the specified player has lost the game. """
+        return player == self.__active_player__ and not self.legal_moves_mask()
+
+    def __get_moves__(self, move):
+        """
+        Generate the list of possible moves for an L-shaped motion (like a
+        knight in chess).
+        """
+        if move == Board.NOT_MOVED:
+            return self.get_blank_spaces()
+
+        r, c = move
+        occupied = self._occupied
+        return [m for bit, m in self.__tables__.moves[c * self.height + r] if not occupied & bit]
+
+    def to_string(self):
+        """Generate a string representation of the current game state, marking
+        the location of each player and indicating which cells have been
+        blocked, and which remain open.
+        """
+        p1_idx = self._cell_of(self.__player_1__)
+        p2_idx = self._cell_of(self.__player_2__)
+
+        out = ''
+
+        for i in range(self.height):
+            out += ' | '
+
+            for j in range(self.width):
+                idx = j * self.height + i
+
+                if not self._occupied >> idx & 1:
+                    out += ' '
+                elif idx == p1_idx:
+                    out += '1'
+                elif idx == p2_idx:
+                    out += '2'
+                else:
+                    out += '-'
+
+                out += ' | '
+            out += '\n\r'
+
+        return out
+
+    def _cell_of(self, player):
+        """ Return the cell index of the specified player (None if unmoved). """
+        if player == self.__active_player__:
+            return self._active_cell
+        elif player == self.__inactive_player__:
+            return self._inactive_cell
+        raise RuntimeError("`player` must be an object registered as a player in the current game.")
@@ -8,14 +8,110 @@ remain compatible with the defaults provided, and none of your changes will
 be available to project reviewers.
 """
 
+import random
 import timeit
 
 from copy import deepcopy
 from copy import copy
 
+from .tables import board_tables, knight_fill
+
 
 TIME_LIMIT_MILLIS = 200
 
+# (width, height) -> ZobristKeys
+__zobrist_keys__ = {}
+
+
+class ZobristKeys(object):
+    """
+    Random 64-bit keys used to hash the positions of a board of a given size.
+
+    The keys are drawn from a generator seeded with the board size, so every
+    process (and every board backend) computes the same hash for the same
+    position. Cells are numbered in column-major order
+    (index = col * height + row).
+
+    Attributes
+    ----------
+    cells : tuple<int>
+        For each cell index, the key XORed in when the cell is blocked.
+
+    locations : (tuple<int>, tuple<int>)
+        For player 1 and player 2, the key XORed in for each cell index the
+        player currently stands on.
+
+    side : int
+        The key XORed in when player 2 holds the initiative.
+    """
+
+    def __init__(self, width, height):
+        rng = random.Random(width * 1000003 + height)
+        size = width * height
+        self.cells = tuple(rng.getrandbits(64) for _ in range(size))
+        self.locations = (tuple(rng.getrandbits(64) for _ in range(size)),
+                          tuple(rng.getrandbits(64) for _ in range(size)))
+        self.side = rng.getrandbits(64)
+
+
+def zobrist_keys(width, height):
+    """ Return the (memoized) `ZobristKeys` for a width x height board. """
+    keys = __zobrist_keys__.get((width, height))
+    if keys is None:
+        keys = ZobristKeys(width, height)
+        __zobrist_keys__[(width, height)] = keys
+    return keys
+
+
+def knight_components(masks, open_mask):
+    """
+    Return the connected components of the knight-move graph over the cells
+    of `open_mask`, as a tuple of cell bitmasks.
+
+    Parameters
+    ----------
+    masks : sequence<int>
+        For each cell index, the bitmask of the cells a knight can reach.
+
+    open_mask : int
+        The bitmask of the cells in the graph.
+
+    Returns
+    ----------
+    tuple<int>
+    """
+    components = []
+    while open_mask:
+        component = knight_fill(masks, open_mask & -open_mask, open_mask, open_mask)
+        components.append(component)
+        open_mask ^= component
+    return tuple(components)
+
+
+def split_component(masks, component, idx):
+    """
+    Return the connected components left when cell `idx` is removed from a
+    connected `component` of the knight-move graph.
+
+    Only the component that loses a cell can split, and it usually stays
+    connected: a fill from one knight neighbor of the removed cell stops as
+    soon as it reaches all the others, so the full fill only runs when the
+    component actually splits.
+    """
+    rest = component & ~(1 << idx)
+    neighbors = masks[idx] & rest
+    parts = []
+    while neighbors:
+        part = knight_fill(masks, neighbors & -neighbors, rest, neighbors)
+        if not neighbors & ~part:
+            #every cell left connects to the removed cell through a neighbor
+            parts.append(rest)
+            break
+        parts.append(part)
+        rest ^= part
+        neighbors &= ~part
+    return parts
+
 
 class Board(object):
     """
@@ -52,6 +148,11 @@ class Board(object):
         self.__board_state__ = [[Board.BLANK for i in range(width)] for j in range(height)]
         self.__last_player_move__ = {player_1: Board.NOT_MOVED, player_2: Board.NOT_MOVED}
         self.__player_symbols__ = {Board.BLANK: Board.BLANK, player_1: 1, player_2: 2}
+        self.__undo_stack__ = []
+        self.__hash_key__ = None
+        self.__components__ = None
+        self.__blank_mask__ = None
+        self.__tables__ = board_tables(width, height)
 
     @property
     def active_player(self):
@@ -69,6 +170,109 @@ class Board(object):
         """
         return self.__inactive_player__
 
+    @property
+    def hash_key(self):
+        """
+        64-bit Zobrist key of the current game state, covering the blocked
+        cells, the location of both players and the player to move.
+
+        The key is computed from scratch the first time it is requested and
+        then updated incrementally by every `apply_move()`.
+        """
+        if self.__hash_key__ is None:
+            self.__hash_key__ = self.__compute_hash_key__()
+        return self.__hash_key__
+
+    def __compute_hash_key__(self):
+        """ Compute the Zobrist key of the current game state from scratch. """
+        keys = zobrist_keys(self.width, self.height)
+        key = keys.side if self.move_count & 1 else 0
+        for j in range(self.width):
+            for i in range(self.height):
+                if self.__board_state__[i][j] != Board.BLANK:
+                    key ^= keys.cells[j * self.height + i]
+        for slot, player in enumerate((self.__player_1__, self.__player_2__)):
+            move = self.get_player_location(player)
+            if move != Board.NOT_MOVED:
+                key ^= keys.locations[slot][move[1] * self.height + move[0]]
+        return key
+
+    @property
+    def components(self):
+        """
+        The connected components of the knight-move graph over the blank
+        cells, as a tuple of cell bitmasks (index = col * height + row).
+
+        The components are computed from scratch the first time they are
+        requested and then updated incrementally by every `apply_move()`.
+        """
+        if self.__components__ is None:
+            self.__components__ = knight_components(self.__knight_masks__(),
+                                                    self.blank_mask())
+        return self.__components__
+
+    def __knight_masks__(self):
+        """ Return the knight destination bitmask of every cell index. """
+        return self.__tables__.masks
+
+    def __block_cell__(self, idx):
+        """ Remove cell `idx` from the (already computed) components. """
+        components = []
+        for component in self.__components__:
+            if component >> idx & 1:
+                components.extend(split_component(self.__knight_masks__(), component, idx))
+            else:
+                components.append(component)
+        self.__components__ = tuple(components)
+
+    def reachable_region(self, player):
+        """
+        Return the bitmask of the blank cells the specified player can reach
+        in any number of moves (every blank cell for a player who has not
+        moved yet).
+
+        Parameters
+        ----------
+        player : object
+            An object registered as a player in the current game.
+
+        Returns
+        ----------
+        int
+            The union of the components next to the player.
+        """
+        move = self.get_player_location(player)
+        region = 0
+        if move == Board.NOT_MOVED:
+            for component in self.components:
+                region |= component
+            return region
+        neighbors = self.__knight_masks__()[move[1] * self.height + move[0]]
+        for component in self.components:
+            if component & neighbors:
+                region |= component
+        return region
+
+    def reachable_count(self, player):
+        """ Return the number of blank cells the specified player can reach. """
+        return bin(self.reachable_region(player)).count("1")
+
+    def players_separated(self):
+        """
+        Test whether both players have moved and can no longer reach a common
+        blank cell, in which case each of them plays alone in its own region.
+        """
+        moves = [self.get_player_location(player)
+                 for player in (self.__player_1__, self.__player_2__)]
+        if Board.NOT_MOVED in moves:
+            return False
+        masks = self.__knight_masks__()
+        neighbors = [masks[c * self.height + r] for r, c in moves]
+        for component in self.components:
+            if component & neighbors[0] and component & neighbors[1]:
+                return False
+        return True
+
     def get_opponent(self, player):
         """
         Return the opponent of the supplied player.
@@ -100,6 +304,9 @@ class Board(object):
         new_board.__last_player_move__ = copy(self.__last_player_move__)
         new_board.__player_symbols__ = copy(self.__player_symbols__)
         new_board.__board_state__ = deepcopy(self.__board_state__)
+        new_board.__hash_key__ = self.__hash_key__
+        new_board.__components__ = self.__components__
+        new_board.__blank_mask__ = self.__blank_mask__
         return new_board
 
     def forecast_move(self, move):
@@ -149,6 +356,21 @@ class Board(object):
         return [(i, j) for j in range(self.width) for i in range(self.height)
             if self.__board_state__[i][j] == Board.BLANK]
 
+    def blank_mask(self):
+        """
+        Return the locations that are still available on the board as a
+        bitmask of cell indices (index = col * height + row).
+
+        The mask is computed from scratch the first time it is requested and
+        then updated incrementally by every `apply_move()` and `pop_move()`.
+        """
+        if self.__blank_mask__ is None:
+            open_mask = 0
+            for r, c in self.get_blank_spaces():
+                open_mask |= 1 << (c * self.height + r)
+            self.__blank_mask__ = open_mask
+        return self.__blank_mask__
+
     def get_player_location(self, player):
         """
         Find the current location of the specified player on the board.
@@ -200,11 +422,66 @@ class Board(object):
         None
         """
         row, col = move
+        idx = col * self.height + row
+        if self.__hash_key__ is not None:
+            keys = zobrist_keys(self.width, self.height)
+            locations = keys.locations[self.move_count & 1]
+            last_move = self.__last_player_move__[self.active_player]
+            key = self.__hash_key__ ^ keys.side
+            if last_move != Board.NOT_MOVED:
+                key ^= locations[last_move[1] * self.height + last_move[0]]
+            self.__hash_key__ = key ^ keys.cells[idx] ^ locations[idx]
+        if self.__components__ is not None:
+            self.__block_cell__(idx)
+        if self.__blank_mask__ is not None:
+            self.__blank_mask__ &= ~(1 << idx)
         self.__last_player_move__[self.active_player] = move
         self.__board_state__[row][col] = self.__player_symbols__[self.active_player]
         self.__active_player__, self.__inactive_player__ = self.__inactive_player__, self.__active_player__
         self.move_count += 1
 
+    def push_move(self, move):
+        """
+        Apply a move in place and remember how to take it back with
+        `pop_move()`. This is the cheap alternative to `forecast_move()` for
+        searches that walk the game tree on a single board.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+
+        Returns
+        ----------
+        None
+        """
+        self.__undo_stack__.append((self.__last_player_move__[self.__active_player__],
+                                    self.__hash_key__, self.__components__))
+        self.apply_move(move)
+
+    def pop_move(self):
+        """
+        Undo the last move applied with `push_move()`, restoring the blocked
+        cells, player locations, initiative and move count. Only moves pushed
+        on this board object can be undone (copies start with an empty
+        history).
+
+        Returns
+        ----------
+        (int, int)
+            The move that was taken back.
+        """
+        previous_move, self.__hash_key__, self.__components__ = self.__undo_stack__.pop()
+        self.__active_player__, self.__inactive_player__ = self.__inactive_player__, self.__active_player__
+        move = self.__last_player_move__[self.__active_player__]
+        self.__board_state__[move[0]][move[1]] = Board.BLANK
+        if self.__blank_mask__ is not None:
+            self.__blank_mask__ |= 1 << (move[1] * self.height + move[0])
+        self.__last_player_move__[self.__active_player__] = previous_move
+        self.move_count -= 1
+        return move
+
     def is_winner(self, player):
         """ Test whether the specified player has won the game. """
         return player == self.inactive_player and not self.get_legal_moves(self.active_player)
@@ -257,11 +534,10 @@ class Board(object):
             return self.get_blank_spaces()
 
         r, c = move
+        board_state = self.__board_state__
 
-        directions = [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
-                      (1, -2),  (1, 2), (2, -1),  (2, 1)]
-
-        valid_moves = [(r+dr,c+dc) for dr, dc in directions if self.move_is_legal((r+dr, c+dc))]
+        valid_moves = [(row, col) for row, col in self.__tables__.neighbors[c * self.height + r]
+                       if board_state[row][col] == Board.BLANK]
 
         return valid_moves
 
@@ -0,0 +1,218 @@
+"""
+This file contains the `BoardTables` class, which precomputes the move and
+positional tables of a board of a given size so that move generation and
+evaluation functions read them instead of recomputing offsets, bounds checks
+and distances at every node.
+
+Cells are numbered in column-major order (index = col * height + row), the
+same numbering as `isolation.BitBoard` and the Zobrist keys.
+
+The tables are memoized per (width, height) in every process, the first
+time a board of that size asks for them (about 0.4 ms for a 7x7 board).
+Nothing is read from disk automatically: a program that wants to skip even
+that can call `load_tables()` once at start-up and `save_tables()` once the
+board sizes it uses have been built. The cache file is a pickle, so only load
+files you wrote yourself.
+"""
+
+import os
+import pickle
+
+
+# format of the cache files written by save_tables(); change it whenever the
+# attributes of BoardTables change, so that older files are rebuilt
+TABLES_VERSION = 5
+
+DIRECTIONS = [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
+              (1, -2),  (1, 2), (2, -1),  (2, 1)]
+
+KING_DIRECTIONS = [(-1, 1), (0, 1), (1, 1), (-1, 0),
+                   (1, 0),  (-1, -1), (0, -1),  (1, -1)]
+
+# (width, height) -> BoardTables
+__board_tables__ = {}
+
+
+class BoardTables(object):
+    """
+    Precomputed move and positional tables for a board of a given size.
+
+    Attributes
+    ----------
+    cells : tuple<(int, int)>
+        The (row, column) coordinates of each cell index.
+
+    neighbors : tuple<tuple<(int, int)>>
+        For each cell index, the (row, column) knight destinations inside the
+        board, in the same order as `Board.__get_moves__`.
+
+    directions : tuple<tuple<int>>
+        For each cell index, the index in `DIRECTIONS` of each of its
+        `neighbors`.
+
+    masks : tuple<int>
+        For each cell index, the bitmask of the cells a knight can reach.
+
+    moves : tuple<tuple<(int, (int, int))>>
+        For each cell index, the (bit, (row, column)) pairs of the knight
+        destinations, in the same order as `neighbors`.
+
+    knight_bits : tuple<tuple<(int, int)>>
+        For each cell index, the (bit, direction bit) pairs of the knight
+        destinations, in the same order as `neighbors`: the bit of the
+        destination in `masks`, and 1 << its index in `DIRECTIONS`.
+
+    king_neighbors : tuple<tuple<(int, int)>>
+        For each cell index, the (row, column) coordinates of the adjacent
+        cells (one king step away) inside the board, in the order of
+        `KING_DIRECTIONS`.
+
+    centrality : tuple<float>
+        For each cell index, the distance factor of the "distance to center"
+        heuristics: 1 - |row - (width - 1) / 2| / width
+        - |col - (height - 1) / 2| / height (1 at the center of a square
+        board).
+
+    full_mask : int
+        The bitmask of every cell of the board.
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.cells = tuple((r, c) for c in range(width) for r in range(height))
+
+        neighbors = []
+        directions = []
+        masks = []
+        for r, c in self.cells:
+            dirs = tuple(d for d, (dr, dc) in enumerate(DIRECTIONS)
+                         if 0 <= r + dr < height and 0 <= c + dc < width)
+            dests = tuple((r + DIRECTIONS[d][0], c + DIRECTIONS[d][1]) for d in dirs)
+            neighbors.append(dests)
+            directions.append(dirs)
+            mask = 0
+            for row, col in dests:
+                mask |= 1 << (col * height + row)
+            masks.append(mask)
+
+        self.neighbors = tuple(neighbors)
+        self.directions = tuple(directions)
+        self.masks = tuple(masks)
+        self.moves = tuple(tuple((1 << (col * height + row), (row, col))
+                                 for row, col in dests)
+                           for dests in neighbors)
+        self.knight_bits = tuple(tuple((bit, 1 << d) for d, (bit, _) in zip(dirs, moves))
+                                 for dirs, moves in zip(directions, self.moves))
+        self.king_neighbors = tuple(tuple((r + dr, c + dc) for dr, dc in KING_DIRECTIONS
+                                          if 0 <= r + dr < height and 0 <= c + dc < width)
+                                    for r, c in self.cells)
+
+        center_x = (width - 1) / 2
+        center_y = (height - 1) / 2
+        self.centrality = tuple(1 - abs(r - center_x) / float(width)
+                                - abs(c - center_y) / float(height)
+                                for r, c in self.cells)
+        self.full_mask = (1 << (width * height)) - 1
+
+    def __reduce__(self):
+        # boards pickled for other processes only carry the size; the tables
+        # are rebuilt (or found in the memo) on the other side
+        return board_tables, (self.width, self.height)
+
+
+def knight_fill(masks, start, open_mask, targets=None, steps=-1):
+    """
+    Return the cells of `start` and the cells of `open_mask` reachable from
+    them by knight moves, stopping early once every cell of `targets` is
+    reached (when given) or after `steps` moves (when not negative).
+
+    Parameters
+    ----------
+    masks : sequence<int>
+        For each cell index, the bitmask of the cells a knight can reach
+        (`BoardTables.masks`).
+
+    start : int
+        The bitmask of the cells the fill starts from.
+
+    open_mask : int
+        The bitmask of the cells the fill may go through.
+
+    Returns
+    ----------
+    int
+    """
+    reached = frontier = start
+    while frontier and steps and (targets is None or targets & ~reached):
+        new = 0
+        while frontier:
+            bit = frontier & -frontier
+            frontier ^= bit
+            new |= masks[bit.bit_length() - 1]
+        frontier = new & open_mask & ~reached
+        reached |= frontier
+        steps -= 1
+    return reached
+
+
+def board_tables(width, height):
+    """ Return the (memoized) `BoardTables` for a width x height board. """
+    tables = __board_tables__.get((width, height))
+    if tables is None:
+        tables = BoardTables(width, height)
+        __board_tables__[(width, height)] = tables
+    return tables
+
+
+def save_tables(path):
+    """
+    Save every memoized `BoardTables` to a cache file.
+
+    Parameters
+    ----------
+    path : str
+        The path of the cache file (overwritten).
+    """
+    states = {size: tables.__dict__ for size, tables in __board_tables__.items()}
+    with open(path, "wb") as f:
+        pickle.dump((TABLES_VERSION, states), f, pickle.HIGHEST_PROTOCOL)
+
+
+def load_tables(path):
+    """
+    Memoize the `BoardTables` saved in a cache file by `save_tables()`.
+
+    A missing file is ignored, and so is a file written with another
+    `TABLES_VERSION` or holding tables that lack an attribute or do not
+    match their size: those tables are rebuilt when first needed. The file is
+    unpickled, so it must come from a trusted source.
+
+    Parameters
+    ----------
+    path : str
+        The path of the cache file.
+
+    Returns
+    ----------
+    int
+        The number of board sizes loaded.
+    """
+    if not os.path.exists(path):
+        return 0
+    with open(path, "rb") as f:
+        saved = pickle.load(f)
+    if not isinstance(saved, tuple) or len(saved) != 2 or \
+            saved[0] != TABLES_VERSION:
+        return 0
+    expected = set(BoardTables(1, 1).__dict__)
+    loaded = {}
+    for (width, height), state in saved[1].items():
+        if set(state) != expected or len(state["cells"]) != width * height or \
+                (state["width"], state["height"]) != (width, height):
+            return 0
+        tables = BoardTables.__new__(BoardTables)
+        tables.__dict__.update(state)
+        loaded[(width, height)] = tables
+    __board_tables__.update(loaded)
+    return len(loaded)
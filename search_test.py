@@ -0,0 +1,1002 @@
+"""
+This file contains test cases for the search extensions of `CustomPlayer`
+(transposition table, iterative deepening driver, ...) that go beyond the
+project requirements checked in agent_test.py.
+"""
+import functools
+import gc
+import itertools
+import multiprocessing
+import pickle
+import random
+import time
+import timeit
+import unittest
+
+from multiprocessing import shared_memory
+
+import isolation
+import game_agent
+
+from sample_players import improved_score
+
+
+def random_position(agent, seed, plies, w=7, h=7):
+    """Return a board with `agent` to move after `plies` random moves
+    (or fewer if the game ends first; the game is never over on return).
+    """
+    rng = random.Random(seed)
+    players = (agent, "opponent") if plies % 2 == 0 else ("opponent", agent)
+    board = isolation.Board(players[0], players[1], w, h)
+    for _ in range(plies):
+        legal_moves = board.get_legal_moves()
+        next_moves = [m for m in legal_moves
+                      if board.forecast_move(m).get_legal_moves()]
+        if not next_moves:
+            break
+        board.apply_move(rng.choice(next_moves))
+    return board
+
+
+def alphabeta_score(agent, board, depth):
+    """Return the score of `board` searched to `depth` by alphabeta()."""
+    return agent.alphabeta(board, depth)[0]
+
+
+def compare_searches(test, reference, agentUT, positions, depths,
+                     search=alphabeta_score):
+    """Search the (seed, plies) `positions` of random_position() to each of
+    `depths` with both agents, and assert that `agentUT` finds the result
+    of `reference`; `search(agent, board, depth)` returns the result
+    compared. Return the number of nodes searched by each agent.
+    """
+    for agent in (reference, agentUT):
+        agent.time_left = lambda: 1e6
+        agent.nodes = 0
+    for seed, plies in positions:
+        board = random_position(reference, seed, plies)
+        other = random_position(agentUT, seed, plies)
+        for depth in depths:
+            test.assertEqual(search(reference, board, depth),
+                             search(agentUT, other, depth))
+    return reference.nodes, agentUT.nodes
+
+
+class IterativeDeepeningTest(unittest.TestCase):
+
+    def test_single_move(self):
+        """ Test get_move returns the only legal move without searching """
+        agentUT = game_agent.CustomPlayer(score_fn=improved_score,
+                                          method="alphabeta")
+        board = isolation.Board(agentUT, "opponent", 3, 3)
+        board.apply_move((0, 0))
+        board.apply_move((1, 2))
+        legal_moves = board.get_legal_moves()
+        self.assertEqual(len(legal_moves), 1)
+        self.assertEqual(agentUT.get_move(board, legal_moves, lambda: -1),
+                         legal_moves[0])
+
+    def test_stops_when_exhausted(self):
+        """ Test iterative deepening stops once the whole tree is searched """
+        agentUT = game_agent.CustomPlayer(score_fn=improved_score,
+                                          method="alphabeta")
+        board = isolation.Board(agentUT, "opponent", 3, 4)
+        board.apply_move((0, 0))
+        board.apply_move((3, 2))
+        move = agentUT.get_move(board, board.get_legal_moves(), lambda: 1e6)
+        self.assertIn(move, board.get_legal_moves())
+        self.assertLess(agentUT.completed_depth, 3 * 4)
+
+
+class RootRecorder(game_agent.CustomPlayer):
+    """A `CustomPlayer` recording the window and the best (score, move) of
+    every root search, including the aspiration re-searches."""
+
+    def search_root(self, game, root_moves, depth, scores=None,
+                    alpha=float("-inf"), beta=float("inf")):
+        scores = game_agent.CustomPlayer.search_root(
+            self, game, root_moves, depth, scores, alpha, beta)
+        self.root_searches.append(
+            (depth, alpha, beta, game_agent.best_score_move(scores, True)))
+        return scores
+
+
+class AspirationWindowTest(unittest.TestCase):
+
+    def test_same_results(self):
+        """ Test every completed depth finds the full window score and move
+        after the aspiration window fails high and low """
+        fail_high = fail_low = 0
+        # positions where the best root move of every depth is unique, so the
+        # re-searched root move order cannot pick another move on a tie
+        positions = [(0, 6), (3, 6), (5, 4), (7, 4), (8, 4)]
+        for method in ("alphabeta", "pvs"):
+            for seed, plies in positions:
+                results = []
+                for window in ({}, {"aspiration_window": 0.5,
+                                    "aspiration_growth": 2.}):
+                    agentUT = RootRecorder(score_fn=improved_score,
+                                           method=method, **window)
+                    agentUT.root_searches = []
+                    board = random_position(agentUT, seed, plies, 5, 5)
+                    self.assertGreater(len(board.get_legal_moves()), 1)
+                    agentUT.get_move(board, board.get_legal_moves(), lambda: 1e6)
+
+                    # the last search of each depth is the completed one
+                    completed = {}
+                    for depth, alpha, beta, (score, move) in agentUT.root_searches:
+                        completed[depth] = (score, move)
+                        fail_high += beta != float("inf") and score >= beta
+                        fail_low += alpha != float("-inf") and score <= alpha
+                    self.assertEqual(max(completed), agentUT.completed_depth)
+                    results.append(completed)
+                self.assertEqual(results[0], results[1])
+        self.assertGreater(fail_high, 0)
+        self.assertGreater(fail_low, 0)
+
+
+class AdaptivePollingTest(unittest.TestCase):
+
+    def test_poll_interval(self):
+        """ Test adaptive polling reads the clock less often but still stops
+        before the deadline """
+        agentUT = game_agent.CustomPlayer(score_fn=improved_score,
+                                          method="alphabeta",
+                                          adaptive_polling=True)
+        board = random_position(agentUT, 0, 4)
+        polls = []
+
+        # a clock driven by the search itself: every node takes 10 us
+        def time_left():
+            polls.append(None)
+            return 100 - agentUT.nodes / 100.
+
+        move = agentUT.get_move(board, board.get_legal_moves(), time_left)
+        self.assertIn(move, board.get_legal_moves())
+        self.assertGreater(time_left(), 0)
+        self.assertGreater(agentUT.nodes, 9000)
+        self.assertLess(len(polls), agentUT.nodes / 10)
+
+
+class ParallelSearchTest(unittest.TestCase):
+
+    def test_same_scores(self):
+        """ Test the root split search finds the sequential best score """
+        for method in ("minimax", "alphabeta", "pvs"):
+            reference = game_agent.CustomPlayer(score_fn=improved_score,
+                                                method=method)
+            agentUT = game_agent.CustomPlayer(score_fn=improved_score,
+                                              method=method, processes=2)
+            try:
+                for agent in (reference, agentUT):
+                    agent.time_left = lambda: 1e6
+                for seed in range(4):
+                    board = random_position(reference, seed, 4 + seed)
+                    other = random_position(agentUT, seed, 4 + seed)
+                    legal_moves = board.get_legal_moves()
+                    agentUT.search_id += 1
+                    for depth in range(3):
+                        expected = reference.search_root(board, legal_moves, depth)
+                        found = agentUT.search_root(other, legal_moves, depth)
+                        self.assertEqual(
+                            game_agent.best_score_move(expected, True),
+                            game_agent.best_score_move(found, True))
+                        if method == "minimax":
+                            self.assertEqual(expected, found)
+            finally:
+                agentUT.close_pool()
+
+    def test_stop_after_fail_high(self):
+        """ Test the tasks of a root split search that failed high are told
+        to stop """
+        reference = game_agent.CustomPlayer(score_fn=improved_score,
+                                            method="alphabeta")
+        agentUT = game_agent.CustomPlayer(score_fn=improved_score,
+                                          method="alphabeta", processes=2)
+        try:
+            for agent in (reference, agentUT):
+                agent.time_left = lambda: 1e6
+            board = random_position(reference, 0, 4)
+            other = random_position(agentUT, 0, 4)
+            expected = reference.search_root(board, board.get_legal_moves(), 2)
+            best_score, best_move = game_agent.best_score_move(expected, True)
+            # search the best move second, with beta at its score
+            root_moves = [m for m in board.get_legal_moves() if m != best_move]
+            root_moves.insert(1, best_move)
+
+            epoch = agentUT.root_epoch.value
+            agentUT.search_id += 1
+            found = agentUT.search_root(other, root_moves, 2,
+                                        beta=best_score)
+            self.assertEqual(game_agent.best_score_move(found, True),
+                             (best_score, best_move))
+            self.assertEqual(len(found), 2)
+            self.assertEqual(agentUT.root_epoch.value, epoch + 1)
+            # a task of the finished iteration stops at its first node
+            self.assertIsNone(agentUT.search_subtree(
+                other, root_moves[2], 2, float("-inf"), best_score,
+                timeit.default_timer() + 1000, agentUT.search_id, False, epoch))
+            self.assertEqual(agentUT.nodes, 1)
+        finally:
+            agentUT.close_pool()
+
+    def test_released_when_collected(self):
+        """ Test the worker processes and the shared table are released when
+        the player is garbage collected without close_pool() """
+        agentUT = game_agent.CustomPlayer(score_fn=improved_score,
+                                          method="alphabeta", processes=2,
+                                          parallel="smp", ponder=True)
+        workers = set(multiprocessing.active_children())
+        self.assertGreaterEqual(len(workers), 3)
+        name = agentUT.tt.shm.name
+        del agentUT
+        gc.collect()
+        self.assertFalse(workers & set(multiprocessing.active_children()))
+        with self.assertRaises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
+
+    def test_bad_options(self):
+        """ Test an unknown search method or parallel mode is rejected """
+        with self.assertRaises(ValueError):
+            game_agent.CustomPlayer(method="negamax")
+        with self.assertRaises(ValueError):
+            game_agent.CustomPlayer(parallel="tree")
+
+    def test_board_transfer(self):
+        """ Test a board sent to a worker keeps the state of both players """
+        for board_cls in (isolation.Board, isolation.BitBoard):
+            board = board_cls("Player1", "Player2")
+            for move in [(3, 3), (0, 0), (1, 2), (2, 1)]:
+                board.apply_move(move)
+            data = game_agent.dump_board(board, "Player2")
+            other = game_agent.load_board(data, "Worker", "Other")
+            self.assertIsInstance(other, board_cls)
+            self.assertEqual(other.active_player, "Other")
+            self.assertEqual(other.get_legal_moves("Worker"),
+                             board.get_legal_moves("Player2"))
+            self.assertEqual(other.hash_key, board.hash_key)
+
+
+def solve_exactly(board):
+    """Return whether the player to move in `board` wins with perfect play,
+    by searching the whole game tree."""
+    return any(not solve_exactly(board.forecast_move(m))
+               for m in board.get_legal_moves())
+
+
+class EndgameSolverTest(unittest.TestCase):
+
+    def test_solve(self):
+        """ Test the solver agrees with a full search once the players are
+        separated """
+        solver = game_agent.EndgameSolver(max_nodes=10**6)
+        solved = 0
+        for seed in range(60):
+            board = random_position("agent", seed, 8, 5, 5)
+            score = solver.solve(board)
+            if score is None:
+                continue
+            solved += 1
+            self.assertEqual(score == float("inf"), solve_exactly(board))
+            move = solver.best_move(board, board.get_legal_moves())
+            self.assertIn(move, board.get_legal_moves())
+        self.assertGreater(solved, 5)
+
+    def test_board_sizes(self):
+        """ Test a solver used on boards of different sizes does not mix up
+        their walks """
+        solver = game_agent.EndgameSolver(max_nodes=10**6)
+        # the walks memoized on this 6x3 board share a key with a walk of
+        # the 4x4 board, where the cell numbers mean other cells
+        first = random_position("agent", 58, 10, 6, 3)
+        board = random_position("agent", 206, 10, 4, 4)
+        self.assertIsNotNone(solver.solve(first))
+        self.assertEqual(solver.solve(board) == float("inf"),
+                         solve_exactly(board))
+        self.assertEqual(set(solver.memos), {(6, 3), (4, 4)})
+
+    def test_not_separated(self):
+        """ Test the solver leaves positions where the players interact """
+        solver = game_agent.EndgameSolver()
+        board = isolation.Board("Player1", "Player2")
+        board.apply_move((3, 3))
+        self.assertIsNone(solver.solve(board))
+        board.apply_move((1, 2))
+        self.assertIsNone(solver.solve(board))
+        self.assertIsNone(solver.best_move(board, board.get_legal_moves()))
+
+
+class CutPlayer(RootRecorder):
+    """A `RootRecorder` whose timer runs out after `cut_moves` root moves of
+    the root search with the window `cut_window` at depth `cut_depth`."""
+
+    def search_root(self, game, root_moves, depth, scores=None,
+                    alpha=float("-inf"), beta=float("inf")):
+        self.moves_left = None
+        if (depth, alpha, beta) == (self.cut_depth,) + self.cut_window:
+            self.moves_left = self.cut_moves
+        return RootRecorder.search_root(self, game, root_moves, depth, scores,
+                                        alpha, beta)
+
+    def search_root_move(self, game, move, depth, alpha, beta, first):
+        if self.moves_left == 0:
+            raise game_agent.Timeout()
+        result = RootRecorder.search_root_move(self, game, move, depth,
+                                               alpha, beta, first)
+        if self.moves_left is not None:
+            self.moves_left -= 1
+        return result
+
+
+class TimeManagerTest(unittest.TestCase):
+
+    def test_should_continue(self):
+        """ Test the next iteration is predicted from the branching factor
+        and extended in critical positions """
+        manager = game_agent.TimeManager(critical_drop=1., extension=2.)
+        self.assertTrue(manager.should_continue(0.))
+        for elapsed in (0.1, 1., 3., 9.):
+            manager.record(elapsed, 0., (0, 0))
+        self.assertAlmostEqual(manager.branching_factor(), 3.)
+        self.assertTrue(manager.should_continue(27.))
+        self.assertFalse(manager.should_continue(26.))
+
+        manager.record(27., -2., (0, 0))
+        self.assertTrue(manager.critical())
+        self.assertTrue(manager.should_continue(41.))
+        manager.record(81., -2., (1, 2))
+        self.assertTrue(manager.critical())
+        manager.record(243., -2., (1, 2))
+        self.assertFalse(manager.critical())
+        self.assertFalse(manager.should_continue(700.))
+
+    def test_get_move(self):
+        """ Test get_move with time management returns a legal move without
+        starting an iteration it cannot finish """
+        agentUT = game_agent.CustomPlayer(score_fn=improved_score,
+                                          method="alphabeta",
+                                          time_management=True)
+        # a clock driven by the search itself: every node takes 10 us
+        time_left = lambda: 60 - agentUT.nodes / 100.
+        for seed in range(3):
+            board = random_position(agentUT, seed, 6)
+            move = agentUT.get_move(board, board.get_legal_moves(), time_left)
+            self.assertIn(move, board.get_legal_moves())
+            # the manager stopped the search, not the timer
+            self.assertGreater(time_left(), agentUT.TIMER_THRESHOLD)
+            self.assertEqual(len(agentUT.time_manager.times),
+                             agentUT.completed_depth + 1)
+
+    def test_aspiration_fail_low(self):
+        """ Test the partial results of an iteration cut by the timer are not
+        used when its first root move failed low in the aspiration window """
+        agentUT = CutPlayer(score_fn=improved_score, method="alphabeta",
+                            time_management=True, aspiration_window=0.5)
+        agentUT.root_searches = []
+        agentUT.cut_depth, agentUT.cut_window, agentUT.cut_moves = 3, (2.5, 3.5), 3
+        board = random_position(agentUT, 0, 4, 6, 6)
+        move = agentUT.get_move(board, board.get_legal_moves(), lambda: 1e6)
+
+        # the cut search was reached, and the move of the last completed
+        # iteration was kept rather than the best of the partial upper bounds
+        self.assertEqual(agentUT.moves_left, 0)
+        self.assertEqual(agentUT.completed_depth, 2)
+        self.assertEqual(move, agentUT.root_searches[-1][3][1])
+        agentUT.moves_left = None
+        exact = dict((m, agentUT.search_root_move(board, m, 3, float("-inf"),
+                                                  float("inf"), True)[0])
+                     for m in board.get_legal_moves())
+        self.assertEqual(exact[move], max(exact.values()))
+
+
+class TranspositionTableTest(unittest.TestCase):
+
+    def test_same_scores(self):
+        """ Test alphabeta returns the same scores with a table, in fewer
+        nodes """
+        plain = game_agent.CustomPlayer(score_fn=improved_score,
+                                        method="alphabeta")
+        cached = game_agent.CustomPlayer(score_fn=improved_score,
+                                         method="alphabeta", table_mb=1)
+        nodes = compare_searches(self, plain, cached,
+                                 [(seed, 4 + seed) for seed in range(10)],
+                                 range(1, 5))
+        self.assertLess(nodes[1], nodes[0])
+
+    def test_replacement(self):
+        """ Test the depth-preferred slot keeps the deepest entry """
+        table = game_agent.TranspositionTable(size_mb=0)
+        table.store(1, 5, 1., game_agent.EXACT, (0, 0))
+        table.store(2, 3, 2., game_agent.EXACT, (1, 1))
+        self.assertEqual(table.probe(1)[1], 5)
+        self.assertEqual(table.probe(2)[1], 3)
+        table.store(3, 1, 3., game_agent.EXACT, (2, 2))
+        self.assertEqual(table.probe(1)[1], 5)
+        self.assertIsNone(table.probe(2))
+        self.assertEqual(table.probe(3)[2], 3.)
+
+
+class TerritoryScoreTest(unittest.TestCase):
+
+    def test_incremental_components(self):
+        """ Test a search with territory_score (wrapped or not) or with the
+        endgame solver only computes the knight-move components from scratch
+        once, at the root """
+        knight_components = isolation.isolation.knight_components
+        rebuilds = []
+
+        def counting_components(masks, open_mask):
+            rebuilds.append(None)
+            return knight_components(masks, open_mask)
+
+        settings = [
+            {"score_fn": game_agent.territory_score},
+            {"score_fn": functools.partial(game_agent.territory_score)},
+            {"score_fn": game_agent.EvalCache(game_agent.territory_score)},
+            {"score_fn": improved_score, "endgame": True}]
+        isolation.isolation.knight_components = counting_components
+        try:
+            for inplace, kwargs in itertools.product((False, True), settings):
+                for board_cls in (isolation.Board, isolation.BitBoard):
+                    agentUT = game_agent.CustomPlayer(
+                        search_depth=3, iterative=False, method="alphabeta",
+                        inplace=inplace, **kwargs)
+                    board = random_position(agentUT, 1, 6)
+                    if board_cls is isolation.BitBoard:
+                        board = isolation.BitBoard.from_board(board)
+                    del rebuilds[:]
+                    move = agentUT.get_move(board, board.get_legal_moves(),
+                                            lambda: 1e6)
+                    self.assertIn(move, board.get_legal_moves())
+                    self.assertEqual(len(rebuilds), 1)
+        finally:
+            isolation.isolation.knight_components = knight_components
+
+
+class FeaturesTest(unittest.TestCase):
+
+    def test_extract_features(self):
+        """ Test extract_features against the moves generated by the board """
+        for board_cls in (isolation.Board, isolation.BitBoard):
+            for seed in range(8):
+                board = board_cls("Player1", "Player2", 6, 7)
+                rng = random.Random(seed)
+                while True:
+                    for player in ("Player1", "Player2"):
+                        opponent = board.get_opponent(player)
+                        features = game_agent.extract_features(board, player)
+                        utility = board.utility(player)
+                        self.assertEqual(features.terminal,
+                                         (utility > 0) - (utility < 0))
+                        self.assertEqual(features.own_moves,
+                                         len(board.get_legal_moves(player)))
+                        self.assertEqual(features.opp_moves,
+                                         len(board.get_legal_moves(opponent)))
+                        self.assertEqual(features.blank_count,
+                                         len(board.get_blank_spaces()))
+                        if board.move_count >= 2:
+                            second = set(m for move in board.get_legal_moves(player)
+                                         for m in board.__get_moves__(move))
+                            self.assertEqual(features.own_two_step, len(second))
+                    legal_moves = board.get_legal_moves()
+                    if not legal_moves:
+                        break
+                    board.apply_move(rng.choice(legal_moves))
+
+    def test_heuristics(self):
+        """ Test the heuristics built on extract_features against the moves
+        generated by the board """
+        for seed in range(8):
+            board = isolation.Board("Player1", "Player2")
+            rng = random.Random(seed)
+            while True:
+                for player in ("Player1", "Player2"):
+                    own = len(board.get_legal_moves(player))
+                    opp = len(board.get_legal_moves(board.get_opponent(player)))
+                    regions = (board.reachable_count(player) -
+                               board.reachable_count(board.get_opponent(player)))
+                    if board.is_loser(player) or board.is_winner(player):
+                        expected = (board.utility(player),) * 4
+                    else:
+                        expected = (8. * own - opp, float(min(own, 1) - min(opp, 1)),
+                                    8. - opp, float(own - opp + regions))
+                    self.assertEqual(
+                        (game_agent.my_improved_score(board, player),
+                         game_agent.survive_score(board, player),
+                         game_agent.opp_open_move_score(board, player),
+                         game_agent.territory_score(board, player)),
+                        expected)
+                    if board.move_count >= 2 and not board.utility(player):
+                        r, c = board.get_player_location(player)
+                        blank = board.get_blank_spaces()
+                        self.assertEqual(
+                            game_agent.free_space(board, player),
+                            sum((r + dr, c + dc) in blank for dr in (-1, 0, 1)
+                                for dc in (-1, 0, 1)))
+                legal_moves = board.get_legal_moves()
+                if not legal_moves:
+                    break
+                board.apply_move(rng.choice(legal_moves))
+
+    def test_free_space_neighbors(self):
+        """ Test free_space counts each of the 8 adjacent cells once """
+        board = isolation.Board("Player1", "Player2")
+        board.apply_move((3, 3))
+        # the opponent blocks the cell down and to the left
+        board.apply_move((4, 2))
+        self.assertEqual(game_agent.free_space(board, "Player1"), 7)
+        self.assertEqual(game_agent.free_space(board, "Player2"), 7)
+        board.apply_move((3, 5))
+        self.assertEqual(game_agent.free_space(board, "Player1"), 8)
+
+
+class KStepMobilityTest(unittest.TestCase):
+
+    def test_matches_moves(self):
+        """ Test k_step_mobility against a search over the legal moves """
+        for board_cls in (isolation.Board, isolation.BitBoard):
+            for seed in range(6):
+                board = board_cls("Player1", "Player2", 7, 6)
+                rng = random.Random(seed)
+                while True:
+                    for player in ("Player1", "Player2"):
+                        reached = set()
+                        frontier = [board.get_player_location(player)]
+                        for k in range(1, 4):
+                            frontier = [m for move in frontier
+                                        for m in board.__get_moves__(move)
+                                        if m not in reached]
+                            reached.update(frontier)
+                            self.assertEqual(
+                                game_agent.k_step_mobility(board, player, k),
+                                len(reached))
+                        features = game_agent.extract_features(board, player)
+                        if board.move_count >= 2:
+                            self.assertEqual(
+                                game_agent.k_step_mobility(board, player, 2) -
+                                game_agent.k_step_mobility(board, player, 1),
+                                features.own_two_step)
+                        utility = board.utility(player)
+                        if utility:
+                            self.assertEqual(game_agent.k_step_score(board, player),
+                                             utility)
+                    legal_moves = board.get_legal_moves()
+                    if not legal_moves:
+                        break
+                    board.apply_move(rng.choice(legal_moves))
+
+
+class PatternScoreTest(unittest.TestCase):
+
+    def test_knight_pattern(self):
+        """ Test knight_pattern encodes the blank knight destinations """
+        directions = isolation.tables.DIRECTIONS
+        for seed in range(4):
+            board = isolation.Board("Player1", "Player2", 6, 5)
+            rng = random.Random(seed)
+            while True:
+                if board.move_count >= 2:
+                    for player in ("Player1", "Player2"):
+                        r, c = board.get_player_location(player)
+                        legal_moves = board.get_legal_moves(player)
+                        pattern = game_agent.knight_pattern(board, player, True)
+                        self.assertEqual(
+                            [bool(pattern >> d & 1) for d in range(8)],
+                            [(r + dr, c + dc) in legal_moves
+                             for dr, dc in directions])
+                        self.assertEqual(pattern >> 8, min(15,
+                            game_agent.k_step_mobility(board, player, 2) -
+                            len(legal_moves)))
+                        utility = board.utility(player)
+                        if utility:
+                            self.assertEqual(game_agent.pattern_score(board, player),
+                                             utility)
+                legal_moves = board.get_legal_moves()
+                if not legal_moves:
+                    break
+                board.apply_move(rng.choice(legal_moves))
+
+    def test_table(self):
+        """ Test the pattern table loads, and falls back to mobility """
+        self.assertEqual(len(game_agent.PATTERN_SCORES),
+                         4096 if game_agent.PATTERN_RING2 else 256)
+        ring2, scores = game_agent.load_pattern_table("missing_table.json")
+        self.assertFalse(ring2)
+        self.assertEqual(scores[0b10010110], 4.)
+
+
+class WeightedHeuristicTest(unittest.TestCase):
+
+    def test_matches_heuristics(self):
+        """ Test weighted heuristics reproduce the hand-written ones """
+        improved = game_agent.weighted_heuristic({"own_moves": 8, "opp_moves": -1,
+                                                  "own_two_step": 0})
+        distance = game_agent.weighted_heuristic(
+            {"own_moves": 1, "opp_moves": -1},
+            phases=[(20, {"own_centrality": 1, "opp_centrality": -1})])
+        # a single phase is scored by its own scorer, without a phase lookup
+        self.assertEqual(improved.args, ((8, -1, 0, 0, 0, 0, 0),))
+        # a player using the heuristic pickles, e.g. for the worker processes
+        agentUT = game_agent.CustomPlayer(score_fn=distance)
+        distance = pickle.loads(pickle.dumps(agentUT)).score
+        for seed in range(10):
+            board = isolation.Board("Player1", "Player2")
+            rng = random.Random(seed)
+            while True:
+                if board.move_count >= 2:
+                    for player in ("Player1", "Player2"):
+                        self.assertEqual(improved(board, player),
+                                         game_agent.my_improved_score(board, player))
+                        self.assertAlmostEqual(
+                            distance(board, player),
+                            game_agent.improved_score_with_distance_factor2(board, player))
+                legal_moves = board.get_legal_moves()
+                if not legal_moves:
+                    break
+                board.apply_move(rng.choice(legal_moves))
+
+    def test_features(self):
+        """ Test the heuristic matches the weighted sum of the
+        extract_features() features of the phase """
+        heuristics = [
+            ({"opp_moves": -2.5}, ()),
+            ({"own_two_step": 1, "opp_two_step": -0.5, "blank_count": 0.1}, ()),
+            ({"own_moves": 3, "opp_moves": -1},
+             [(10, {"own_centrality": 2, "opp_moves": 0}),
+              (25, {"blank_count": -1, "opp_two_step": -1})])]
+        for board_cls in (isolation.Board, isolation.BitBoard):
+            for seed in range(6):
+                board = board_cls("Player1", "Player2")
+                rng = random.Random(seed)
+                while True:
+                    for weights, phases in heuristics:
+                        heuristic = game_agent.weighted_heuristic(weights, phases)
+                        for threshold, phase_weights in sorted(phases):
+                            if board.move_count > threshold:
+                                weights = dict(weights, **phase_weights)
+                        for player in ("Player1", "Player2"):
+                            features = game_agent.extract_features(board, player)
+                            expected = features.terminal * float("inf")
+                            if not features.terminal:
+                                expected = sum(weight * getattr(features, name)
+                                               for name, weight in weights.items())
+                            self.assertAlmostEqual(heuristic(board, player),
+                                                   expected)
+                    legal_moves = board.get_legal_moves()
+                    if not legal_moves:
+                        break
+                    board.apply_move(rng.choice(legal_moves))
+
+    def test_unknown_feature(self):
+        """ Test misspelled features are rejected when building """
+        with self.assertRaises(ValueError):
+            game_agent.weighted_heuristic({"own_move": 1})
+        with self.assertRaises(ValueError):
+            game_agent.weighted_heuristic({}, phases=[(10, {"terminal": 1})])
+
+
+class EvalCacheTest(unittest.TestCase):
+
+    def test_same_scores(self):
+        """ Test alphabeta returns the same scores with a cached score_fn,
+        which looks every evaluation up """
+        for policy in ("lru", "clock"):
+            calls = []
+
+            def counting_score(game, player):
+                calls.append(None)
+                return improved_score(game, player)
+
+            score_fn = game_agent.EvalCache(improved_score, 500, policy)
+            plain = game_agent.CustomPlayer(score_fn=counting_score,
+                                            method="alphabeta")
+            cached = game_agent.CustomPlayer(score_fn=score_fn,
+                                             method="alphabeta")
+            positions = [(seed, 6 + seed) for seed in range(5)]
+            compare_searches(self, plain, cached, positions, range(1, 5))
+            self.assertEqual(score_fn.hits + score_fn.misses, len(calls))
+            self.assertLessEqual(len(score_fn), 500)
+
+            # the leaves of the last search are leaves again two plies later
+            other = random_position(cached, *positions[-1])
+            for _ in range(2):
+                other.apply_move(other.get_legal_moves()[0])
+            hits = score_fn.hits
+            cached.alphabeta(other, 2)
+            self.assertGreater(score_fn.hits, hits)
+
+    def test_repeated_search(self):
+        """ Test searching a position again only hits the cache """
+        score_fn = game_agent.EvalCache(improved_score)
+        agentUT = game_agent.CustomPlayer(score_fn=score_fn, method="alphabeta")
+        agentUT.time_left = lambda: 1e6
+        board = random_position(agentUT, 0, 6)
+        agentUT.alphabeta(board, 3)
+        hits, misses = score_fn.hits, score_fn.misses
+        self.assertEqual(misses, len(score_fn))
+        agentUT.alphabeta(board, 3)
+        self.assertEqual(score_fn.misses, misses)
+        self.assertEqual(score_fn.hits, 2 * hits + misses)
+
+    def test_eviction(self):
+        """ Test both policies evict the score not used for the longest """
+        class Position:
+            def __init__(self, key):
+                self.hash_key = key
+
+        for policy in ("lru", "clock"):
+            calls = []
+            score_fn = game_agent.EvalCache(
+                lambda game, player: calls.append(game.hash_key) or 0.,
+                2, policy)
+            for key in (1, 2, 1, 3, 1, 2):
+                score_fn(Position(key), "player")
+            self.assertEqual(calls, [1, 2, 3, 2])
+            self.assertEqual((score_fn.hits, score_fn.misses), (2, 4))
+            score_fn(Position(1), "opponent")
+            self.assertEqual(calls[-1], 1)
+
+
+class PersistentStateTest(unittest.TestCase):
+
+    def test_reuse(self):
+        """ Test the search state is kept within a game and cleared for a
+        new game """
+        agentUT = game_agent.CustomPlayer(score_fn=improved_score,
+                                          method="pvs", iterative=False,
+                                          table_mb=1, move_ordering=True,
+                                          persistent=True)
+        board = random_position(agentUT, 0, 4)
+        move = agentUT.get_move(board, board.get_legal_moves(), lambda: 1e6)
+        child_key = board.forecast_move(move).hash_key
+        self.assertIsNotNone(agentUT.tt.probe(child_key))
+
+        reply = agentUT.principal_variation[1]
+        board.apply_move(move)
+        board.apply_move(reply)
+        agentUT.get_move(board, board.get_legal_moves(), lambda: 1e6)
+        self.assertEqual(agentUT.tt.generation, 1)
+        self.assertIsNotNone(agentUT.tt.probe(child_key))
+
+        board = random_position(agentUT, 1, 2)
+        agentUT.get_move(board, board.get_legal_moves(), lambda: 1e6)
+        self.assertEqual(agentUT.tt.generation, 0)
+        self.assertIsNone(agentUT.tt.probe(child_key))
+
+
+class PonderTest(unittest.TestCase):
+
+    def test_ponder_hit(self):
+        """ Test the agent searches the replies in another process while the
+        opponent thinks, and continues from the pondered result on a hit """
+        agentUT = RootRecorder(score_fn=improved_score, method="alphabeta",
+                               ponder=True)
+        agentUT.root_searches = []
+        # clocks driven by the search itself; the 10 s of the move also bound
+        # the time spent pondering
+        time_left = lambda: 1e4 - agentUT.nodes
+        try:
+            board = random_position(agentUT, 2, 4)
+            move = agentUT.get_move(board, board.get_legal_moves(), time_left)
+            self.assertIsNotNone(agentUT.ponder_task)
+            generation = agentUT.tt.generation
+
+            # wait for a reply the pondering process has searched
+            board.apply_move(move)
+            reply = None
+            while reply is None and not agentUT.ponder_task.ready():
+                for m in board.get_legal_moves():
+                    entry = agentUT.tt.probe(board.forecast_move(m).hash_key)
+                    if entry is not None and entry[5] == generation:
+                        reply = m
+                        break
+                time.sleep(0.01)
+            self.assertIsNotNone(reply)
+            board.apply_move(reply)
+
+            del agentUT.root_searches[:]
+            move = agentUT.get_move(board, board.get_legal_moves(), time_left)
+            self.assertIn(move, board.get_legal_moves())
+            self.assertTrue(agentUT.ponder_hit)
+            # the search kept the generation of the pondered entries and
+            # started one ply deeper than the pondering process got
+            depth, _ = agentUT.ponder_start
+            self.assertGreaterEqual(depth, entry[1])
+            self.assertEqual(agentUT.root_searches[0][0], depth)
+            self.assertGreaterEqual(agentUT.completed_depth, depth - 1)
+            # only the pondering started after this move advanced it
+            self.assertEqual(agentUT.tt.generation, generation + 1)
+            agentUT.stop_pondering()
+            self.assertIsNone(agentUT.ponder_task)
+        finally:
+            agentUT.close_pool()
+
+    def test_inplace_timeout(self):
+        """ Test pondering starts from the caller's board when an inplace
+        search is cut by the timer """
+        agentUT = game_agent.CustomPlayer(score_fn=improved_score,
+                                          method="alphabeta", inplace=True,
+                                          ponder=True)
+        try:
+            board = random_position(agentUT, 2, 4)
+            move = agentUT.get_move(board, board.get_legal_moves(),
+                                    lambda: 1000 - agentUT.nodes)
+            self.assertLess(agentUT.completed_depth, 7 * 7)
+            after = board.forecast_move(move)
+            self.assertEqual(agentUT.ponder_keys,
+                             set(after.forecast_move(m).hash_key
+                                 for m in after.get_legal_moves()))
+        finally:
+            agentUT.close_pool()
+
+
+class SharedTranspositionTableTest(unittest.TestCase):
+
+    def test_replacement(self):
+        """ Test the shared table packs and replaces entries like the
+        default table """
+        table = game_agent.SharedTranspositionTable(size_mb=0)
+        try:
+            table.store(1, 5, 1.5, game_agent.EXACT, (0, 0))
+            table.store(2, 3, float("-inf"), game_agent.UPPER_BOUND, (6, 1))
+            self.assertEqual(table.probe(1), (1, 5, 1.5, game_agent.EXACT, (0, 0), 0))
+            self.assertEqual(table.probe(2)[1:5],
+                             (3, float("-inf"), game_agent.UPPER_BOUND, (6, 1)))
+            table.store(3, 1, -2.25, game_agent.LOWER_BOUND, None)
+            self.assertEqual(table.probe(1)[1], 5)
+            self.assertIsNone(table.probe(2))
+            self.assertEqual(table.probe(3)[2:5], (-2.25, game_agent.LOWER_BOUND, None))
+
+            table.new_search()
+            table.store(4, 0, 0., game_agent.EXACT, (1, 1))
+            self.assertIsNone(table.probe(1))
+            self.assertEqual(table.probe(4)[5], 1)
+        finally:
+            table.unlink()
+
+    def test_shared(self):
+        """ Test a pickled copy of the table sees the same entries """
+        table = game_agent.SharedTranspositionTable(size_mb=1)
+        try:
+            other = pickle.loads(pickle.dumps(table))
+            other.store(2**64 - 1, 7, 0.5, game_agent.EXACT, (3, 4))
+            self.assertEqual(table.probe(2**64 - 1)[1:5],
+                             (7, 0.5, game_agent.EXACT, (3, 4)))
+            table.new_epoch()
+            self.assertEqual(other.epoch, 1)
+            table.clear()
+            self.assertIsNone(other.probe(2**64 - 1))
+            self.assertEqual(other.epoch, 1)
+        finally:
+            table.unlink()
+
+    def test_lazy_smp(self):
+        """ Test get_move with lazy SMP helpers returns a legal move in time """
+        agentUT = game_agent.CustomPlayer(score_fn=improved_score,
+                                          method="alphabeta", processes=2,
+                                          parallel="smp", table_mb=1)
+        try:
+            board = random_position(agentUT, 3, 6)
+            # a clock driven by the nodes searched in this process; the
+            # helpers are stopped by the table epoch when it runs out
+            time_left = lambda: 100 - agentUT.nodes / 100.
+            epoch = agentUT.tt.epoch
+            move = agentUT.get_move(board, board.get_legal_moves(), time_left)
+            self.assertIn(move, board.get_legal_moves())
+            self.assertGreater(time_left(), 0)
+            self.assertIsNotNone(agentUT.completed_depth)
+            # every iteration started the helpers with a new epoch and
+            # stopped them with another one
+            epochs = agentUT.tt.epoch - epoch
+            self.assertEqual(epochs % 2, 0)
+            self.assertGreaterEqual(epochs, 2 * (agentUT.completed_depth + 1))
+        finally:
+            agentUT.close_pool()
+
+
+class MoveOrderingTest(unittest.TestCase):
+
+    def test_same_scores(self):
+        """ Test move ordering lowers the node count but not the scores """
+        plain = game_agent.CustomPlayer(score_fn=improved_score,
+                                        method="alphabeta")
+        ordered = game_agent.CustomPlayer(score_fn=improved_score,
+                                          method="alphabeta",
+                                          move_ordering=True)
+        nodes = compare_searches(self, plain, ordered,
+                                 [(seed, 4 + seed) for seed in range(10)],
+                                 range(1, 5))
+        self.assertLess(nodes[1], nodes[0])
+
+    def test_order(self):
+        """ Test killer moves come before history moves """
+        ordering = game_agent.MoveOrdering()
+        board = isolation.Board("Player1", "Player2")
+        board.apply_move((3, 3))
+        board.apply_move((0, 0))
+        legal_moves = board.get_legal_moves()
+        ordering.history[("Player1", (2, 1))] = 100
+        ordering.record_cutoff(board, (5, 4), 1)
+        ordering.record_cutoff(board, (1, 4), 2)
+        ordered = ordering.order(board, legal_moves, (4, 5))
+        self.assertEqual(ordered[:4], [(4, 5), (1, 4), (5, 4), (2, 1)])
+        self.assertEqual(sorted(ordered), sorted(legal_moves))
+
+
+class PrincipalVariationSearchTest(unittest.TestCase):
+
+    def test_same_scores(self):
+        """ Test pvs returns the alphabeta scores and a legal PV, in fewer
+        nodes """
+        for score_fn in (improved_score, game_agent.custom_score):
+            reference = game_agent.CustomPlayer(score_fn=score_fn,
+                                                method="alphabeta")
+            agentUT = game_agent.CustomPlayer(score_fn=score_fn,
+                                              method="pvs", table_mb=1,
+                                              move_ordering=True)
+
+            def search(agent, board, depth):
+                scores = agent.search_root(board, board.get_legal_moves(), depth)
+                best_score, best_move = game_agent.best_score_move(scores, True)
+                if agent is agentUT:
+                    pv = agentUT.principal_variation
+                    self.assertEqual(pv[0], best_move)
+                    self.assertLessEqual(len(pv), depth + 1)
+                    line = board
+                    for move in pv:
+                        self.assertIn(move, line.get_legal_moves())
+                        line = line.forecast_move(move)
+                return best_score
+
+            nodes = compare_searches(self, reference, agentUT,
+                                     [(seed, 4 + seed) for seed in range(10)],
+                                     range(4), search)
+            self.assertLess(nodes[1], nodes[0])
+
+
+class MCTSPlayerTest(unittest.TestCase):
+
+    def test_get_move(self):
+        """ Test the MCTS player returns a legal move in time """
+        agentUT = game_agent.MCTSPlayer(seed=0)
+        board = random_position(agentUT, 5, 6)
+        # a clock that loses a millisecond per reading, i.e. per playout
+        clock = iter(range(200, -1, -1))
+        move = agentUT.get_move(board, board.get_legal_moves(),
+                                lambda: next(clock))
+        self.assertIn(move, board.get_legal_moves())
+        self.assertEqual(next(clock), agentUT.TIMER_THRESHOLD - 1)
+        self.assertEqual(agentUT.playouts, 200 - agentUT.TIMER_THRESHOLD)
+        self.assertEqual(agentUT.visits[0], agentUT.playouts)
+        self.assertEqual(agentUT.visits[0], sum(
+            agentUT.visits[agentUT.first_child[0]:
+                           agentUT.first_child[0] + agentUT.num_children[0]]))
+
+    def test_tree_reuse(self):
+        """ Test the subtree after the opponent's reply is kept """
+        agentUT = game_agent.MCTSPlayer(seed=0)
+        board = random_position(agentUT, 6, 4)
+        playouts = iter(range(500, -1, -1))
+        move = agentUT.get_move(board, board.get_legal_moves(),
+                                lambda: next(playouts))
+        child = agentUT.find_child(0, move)
+        board.apply_move(move)
+        reply = max(board.get_legal_moves(),
+                    key=lambda m: agentUT.visits[agentUT.find_child(child, m)])
+        visits = agentUT.visits[agentUT.find_child(child, reply)]
+        board.apply_move(reply)
+
+        agentUT.reuse_tree(board)
+        self.assertGreater(visits, 1)
+        self.assertEqual(agentUT.visits[0], visits)
+        first = agentUT.first_child[0]
+        self.assertEqual(sorted(agentUT.moves[first:first + agentUT.num_children[0]]),
+                         sorted(board.get_legal_moves()))
+
+        board = random_position(agentUT, 7, 4)
+        agentUT.reuse_tree(board)
+        self.assertEqual(agentUT.visits, [0])
+
+
+if __name__ == '__main__':
+    unittest.main()
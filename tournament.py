@@ -31,6 +31,7 @@ from sample_players import null_score
 from sample_players import open_move_score
 from sample_players import improved_score
 from game_agent import CustomPlayer
+from game_agent import MCTSPlayer
 from game_agent import custom_score
 
 NUM_MATCHES = 5  # number of matches against each opponent
@@ -143,6 +144,9 @@ def main():
     AB_ARGS = {"search_depth": 5, "method": 'alphabeta', "iterative": False}
     MM_ARGS = {"search_depth": 3, "method": 'minimax', "iterative": False}
     CUSTOM_ARGS = {"method": 'alphabeta', 'iterative': True}
+    STUDENT_ARGS = dict(CUSTOM_ARGS, table_mb=16, move_ordering=True,
+                        adaptive_polling=True, persistent=True,
+                        time_management=True, endgame=True)
 
     # Create a collection of CPU agents using fixed-depth minimax or alpha beta
     # search, or random selection.  The agent names encode the search method
@@ -161,7 +165,8 @@ def main():
     # relative to the performance of the ID_Improved agent to account for
     # faster or slower computers.
     test_agents = [Agent(CustomPlayer(score_fn=improved_score, **CUSTOM_ARGS), "ID_Improved"),
-                   Agent(CustomPlayer(score_fn=custom_score, **CUSTOM_ARGS), "Student")]
+                   Agent(CustomPlayer(score_fn=custom_score, **STUDENT_ARGS), "Student"),
+                   Agent(MCTSPlayer(), "MCTS")]
     #test_agents = [Agent(CustomPlayer(score_fn=custom_score, **CUSTOM_ARGS), "Student")]
 
     print(DESCRIPTION)